@@ -7,22 +7,26 @@ export default function Dashboard() {
   const [bmi, setBmi] = useState(null);
   const [bmiError, setBmiError] = useState(null);
 
+  const [bmiLoaded, setBmiLoaded] = useState(false);
+
   useEffect(() => {
-    async function loadBMI() {
+    async function loadDashboard() {
       if (!user) return;
-      if (!user.height_cm || !user.weight_kg) return; // needs profile data
       try {
-        const res = await fetch('/me/bmi', {
+        // One round trip: user, education, BMI, medications, readings, 7-day stats
+        const res = await fetch('/dashboard', {
           headers: { Authorization: `Bearer ${token}` },
         });
         const data = await res.json();
-        if (res.ok) setBmi(data);
+        if (res.ok) setBmi(data.bmi);
         else setBmiError(data.error || 'Could not load BMI');
       } catch (e) {
         setBmiError(e.message);
+      } finally {
+        setBmiLoaded(true);
       }
     }
-    loadBMI();
+    loadDashboard();
   }, [user, token]);
 
   if (!user) return <div>Loading...</div>;
@@ -38,12 +42,12 @@ export default function Dashboard() {
 
       <section style={{ marginBottom: 16 }}>
         <h3>BMI</h3>
-        {!user.height_cm || !user.weight_kg ? (
-          <p>Set your height and weight in the Profile page to see your BMI.</p>
-        ) : bmi ? (
+        {bmi ? (
           <p><strong>{bmi.bmi}</strong> — {bmi.category}</p>
         ) : bmiError ? (
           <p style={{ color: 'crimson' }}>{bmiError}</p>
+        ) : bmiLoaded ? (
+          <p>Set your height and weight in the Profile page to see your BMI.</p>
         ) : (
           <p>Loading BMI...</p>
         )}
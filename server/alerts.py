@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import logging
+import threading
+from collections import deque
+from datetime import timedelta
+
+# Remote library imports
+from sqlalchemy import delete, select, tuple_
+
+# Local imports
+from config import db
+from models import Reading, Alert
+from usercache import UserCache
+
+logger = logging.getLogger(__name__)
+
+# Thresholds (mg/dL)
+LOW = 70
+HIGH = 180
+# A fall faster than this (mg/dL per minute) fires rapid_drop
+DROP_RATE = 2.0
+# Readings further apart than this say nothing about rate of change
+MAX_RATE_GAP = timedelta(minutes=30)
+SUSTAINED_HIGH = timedelta(hours=3)
+LOWS_WINDOW = timedelta(hours=24)
+LOWS_COUNT = 3
+# How far back a cold user's state is rebuilt from history
+WARMUP_WINDOW = max(SUSTAINED_HIGH, LOWS_WINDOW)
+# Users kept in memory; evicted users are warmed up again on their next reading
+MAX_USERS = 10000
+
+
+class UserWindow:
+    """Sliding-window state for one user; every update is O(1) amortized."""
+
+    __slots__ = ('last_ts', 'last_value', 'drop_fired', 'high_since', 'high_fired', 'lows')
+
+    def __init__(self):
+        self.last_ts = None
+        self.last_value = None
+        # One rapid_drop per continuous fall; cleared once the rate recovers
+        self.drop_fired = False
+        # Start of the current unbroken run of highs
+        self.high_since = None
+        self.high_fired = False
+        # Ring buffer of low timestamps inside LOWS_WINDOW
+        self.lows = deque(maxlen=LOWS_COUNT)
+
+    def update(self, ts, value):
+        """Feed one reading (in taken_at order); returns [(kind, message)]."""
+        fired = []
+
+        if self.last_ts is not None and ts - self.last_ts <= MAX_RATE_GAP:
+            minutes = (ts - self.last_ts).total_seconds() / 60.0
+            if minutes > 0:
+                rate = (value - self.last_value) / minutes
+                if rate >= -DROP_RATE:
+                    self.drop_fired = False
+                elif not self.drop_fired:
+                    fired.append(('rapid_drop', f'Glucose falling {-rate:.1f} mg/dL per minute'))
+                    self.drop_fired = True
+        else:
+            self.drop_fired = False
+
+        if value > HIGH:
+            if self.high_since is None:
+                self.high_since, self.high_fired = ts, False
+            elif not self.high_fired and ts - self.high_since >= SUSTAINED_HIGH:
+                hours = (ts - self.high_since).total_seconds() / 3600.0
+                fired.append(('sustained_high', f'Glucose above {HIGH} mg/dL for {hours:.1f} hours'))
+                self.high_fired = True
+        else:
+            self.high_since = None
+
+        if value < LOW:
+            self.lows.append(ts)
+            while self.lows and ts - self.lows[0] > LOWS_WINDOW:
+                self.lows.popleft()
+            if len(self.lows) >= LOWS_COUNT:
+                fired.append(('repeated_lows', f'{len(self.lows)} lows below {LOW} mg/dL within 24 hours'))
+                self.lows.clear()
+
+        self.last_ts, self.last_value = ts, value
+        return fired
+
+
+class AlertEngine:
+    """Evaluates committed readings against per-user windows kept in memory."""
+
+    def __init__(self, max_users=MAX_USERS):
+        self.windows = UserCache(self.warm_up, max_users)
+        # Guards the windows themselves; the cache has its own lock for the mapping
+        self.lock = threading.Lock()
+
+    def warm_up(self, user_id, before):
+        """Cold start: rebuild a window from recent history only, without firing."""
+        window = UserWindow()
+        rows = db.session.execute(
+            select(Reading.taken_at, Reading.value)
+            .where(
+                Reading.user_id == user_id,
+                Reading.taken_at >= before - WARMUP_WINDOW,
+                Reading.taken_at < before,
+            )
+            .order_by(Reading.taken_at)
+        )
+        for taken_at, value in rows:
+            window.update(taken_at, value)
+        return window
+
+    def evict(self, user_id):
+        self.windows.evict(user_id)
+
+    def process(self, readings):
+        """Evaluate newly committed readings and persist any alerts they fire."""
+        alerts = []
+        by_user = {}
+        for reading in sorted(readings, key=lambda r: (r.user_id, r.taken_at)):
+            by_user.setdefault(reading.user_id, []).append(reading)
+        for user_id, user_readings in by_user.items():
+            window = self.windows.get(user_id, user_readings[0].taken_at)
+            with self.lock:
+                for reading in user_readings:
+                    # Late arrivals (backfills) cannot rewind the window; replay() covers them
+                    if window.last_ts is not None and reading.taken_at <= window.last_ts:
+                        continue
+                    for kind, message in window.update(reading.taken_at, reading.value):
+                        alerts.append(Alert(
+                            user_id=reading.user_id,
+                            reading_id=reading.id,
+                            kind=kind,
+                            message=message,
+                            value=reading.value,
+                            triggered_at=reading.taken_at,
+                        ))
+        if not alerts:
+            return []
+        try:
+            db.session.add_all(alerts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception('Could not persist alerts')
+            return []
+        return alerts
+
+    def replay_user(self, user_id, batch_size):
+        """Replace one user's alerts from their history; returns (window, alerts fired).
+
+        Reads pages of ``batch_size`` readings by (taken_at, id) and commits
+        after each, so no transaction outlives one page.
+        """
+        window = UserWindow()
+        total = 0
+        after = None
+        db.session.execute(delete(Alert).where(Alert.user_id == user_id))
+        while True:
+            query = select(Reading.id, Reading.taken_at, Reading.value).where(Reading.user_id == user_id)
+            if after is not None:
+                query = query.where(tuple_(Reading.taken_at, Reading.id) > after)
+            rows = db.session.execute(query.order_by(Reading.taken_at, Reading.id).limit(batch_size)).all()
+            pending = []
+            for reading_id, taken_at, value in rows:
+                for kind, message in window.update(taken_at, value):
+                    pending.append({
+                        'user_id': user_id,
+                        'reading_id': reading_id,
+                        'kind': kind,
+                        'message': message,
+                        'value': value,
+                        'triggered_at': taken_at,
+                    })
+            if pending:
+                db.session.execute(Alert.__table__.insert(), pending)
+                total += len(pending)
+            db.session.commit()
+            if len(rows) < batch_size:
+                return window, total
+            after = (rows[-1].taken_at, rows[-1].id)
+
+    def replay(self, user_id=None, batch_size=5000):
+        """Rebuild window state and the alerts table from full history.
+
+        Goes user by user in short transactions (see replay_user), so other
+        writers are never locked out for the length of the whole replay.
+        """
+        if user_id is None:
+            user_ids = db.session.execute(
+                select(Reading.user_id).distinct().order_by(Reading.user_id)
+            ).scalars().all()
+            # Users without readings have nothing to rebuild their alerts from
+            db.session.execute(delete(Alert).where(Alert.user_id.not_in(select(Reading.user_id).distinct())))
+            db.session.commit()
+        else:
+            user_ids = [user_id]
+
+        windows = {}
+        total = 0
+        for uid in user_ids:
+            windows[uid], fired = self.replay_user(uid, batch_size)
+            total += fired
+
+        if user_id is None:
+            self.windows.clear()
+        self.windows.install(windows)
+        return total
+
+
+engine = AlertEngine()
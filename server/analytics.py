@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import json
+import logging
+from datetime import datetime, timedelta
+
+# Remote library imports
+from sqlalchemy import create_engine, select
+
+# Local imports
+from config import db
+from models import User, Reading, Medication, AnalyticsSnapshot, bmi_for
+from alerts import LOW, HIGH
+
+logger = logging.getLogger(__name__)
+
+# Users summarized per pool task
+CHUNK_SIZE = 500
+MAX_WORKERS = 4
+WINDOW_DAYS = 30
+
+
+class Histogram:
+    """Fixed-width bins over [lo, hi]; merging adds counts, so chunks combine exactly."""
+
+    def __init__(self, lo, hi, width):
+        self.lo, self.hi, self.width = lo, hi, width
+        self.counts = [0] * (int((hi - lo) / width) + 1)
+
+    def add(self, value):
+        value = min(max(value, self.lo), self.hi)
+        self.counts[int((value - self.lo) / self.width)] += 1
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+
+    def quantile(self, q):
+        total = sum(self.counts)
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                return self.lo + i * self.width
+        return self.hi
+
+    def to_dict(self):
+        return {
+            'lo': self.lo,
+            'width': self.width,
+            'counts': self.counts,
+        }
+
+
+class GroupStats:
+    """Mergeable aggregate for one cohort (counts, sums and histograms only)."""
+
+    def __init__(self):
+        self.users = 0
+        self.users_with_readings = 0
+        self.readings = 0
+        self.value_sum = 0.0
+        self.in_range = 0
+        self.glucose = Histogram(40, 500, 1)
+        # Distribution of per-user time in range, in 10% buckets
+        self.user_tir = Histogram(0, 100, 10)
+        self.meds_taken = 0
+        self.meds_missed = 0
+        self.meds_pending = 0
+
+    def merge(self, other):
+        self.users += other.users
+        self.users_with_readings += other.users_with_readings
+        self.readings += other.readings
+        self.value_sum += other.value_sum
+        self.in_range += other.in_range
+        self.glucose.merge(other.glucose)
+        self.user_tir.merge(other.user_tir)
+        self.meds_taken += other.meds_taken
+        self.meds_missed += other.meds_missed
+        self.meds_pending += other.meds_pending
+
+    def to_dict(self):
+        decided = self.meds_taken + self.meds_missed
+        return {
+            'users': self.users,
+            'users_with_readings': self.users_with_readings,
+            'readings': self.readings,
+            'mean_glucose': round(self.value_sum / self.readings, 1) if self.readings else None,
+            'median_glucose': self.glucose.quantile(0.5),
+            'time_in_range_pct': round(100.0 * self.in_range / self.readings, 1) if self.readings else None,
+            'median_user_time_in_range_pct': self.user_tir.quantile(0.5),
+            'user_time_in_range_distribution': self.user_tir.to_dict(),
+            'medication_adherence_pct': round(100.0 * self.meds_taken / decided, 1) if decided else None,
+            'medications': {'taken': self.meds_taken, 'missed': self.meds_missed, 'pending': self.meds_pending},
+        }
+
+
+# One engine per pool process, created on first use
+_engine = None
+
+
+def summarize_chunk(db_uri, users, since):
+    """Summarize a chunk of users in a worker process.
+
+    ``users`` maps user_id -> (diabetes_type group, BMI group). Returns
+    {'diabetes_type': {group: GroupStats}, 'bmi_category': {...}}.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine(db_uri)
+    ids = list(users)
+    per_user = {uid: GroupStats() for uid in ids}
+    with _engine.connect() as conn:
+        readings = conn.execute(
+            select(Reading.user_id, Reading.value)
+            .where(Reading.user_id.in_(ids), Reading.taken_at >= since)
+        )
+        for uid, value in readings:
+            stats = per_user[uid]
+            stats.readings += 1
+            stats.value_sum += value
+            stats.glucose.add(value)
+            if LOW <= value <= HIGH:
+                stats.in_range += 1
+        medications = conn.execute(
+            select(Medication.user_id, Medication.status).where(Medication.user_id.in_(ids))
+        )
+        for uid, status in medications:
+            stats = per_user[uid]
+            if status == 'taken':
+                stats.meds_taken += 1
+            elif status == 'missed':
+                stats.meds_missed += 1
+            else:
+                stats.meds_pending += 1
+
+    result = {'diabetes_type': {}, 'bmi_category': {}}
+    for uid, stats in per_user.items():
+        stats.users = 1
+        if stats.readings:
+            stats.users_with_readings = 1
+            stats.user_tir.add(100.0 * stats.in_range / stats.readings)
+        for dimension, group in zip(('diabetes_type', 'bmi_category'), users[uid]):
+            result[dimension].setdefault(group, GroupStats()).merge(stats)
+    return result
+
+
+def user_groups():
+    """user_id -> (diabetes_type, BMI category), using 'unknown' for missing values."""
+    groups = {}
+    rows = db.session.execute(select(User.id, User.diabetes_type, User.height_cm, User.weight_kg))
+    for user in rows:
+        bmi = bmi_for(user.height_cm, user.weight_kg)
+        groups[user.id] = ((user.diabetes_type or 'unknown').lower(), bmi[1] if bmi else 'unknown')
+    return groups
+
+
+def compute(window_days=WINDOW_DAYS, max_workers=MAX_WORKERS, chunk_size=CHUNK_SIZE):
+    """Cohort statistics over the last ``window_days``, computed in parallel chunks."""
+    # Imported here: the API process serves cached analytics and never forks workers
+    from concurrent.futures import ProcessPoolExecutor
+
+    since = datetime.utcnow() - timedelta(days=window_days)
+    groups = user_groups()
+    ids = sorted(groups)
+    chunks = [
+        {uid: groups[uid] for uid in ids[start:start + chunk_size]}
+        for start in range(0, len(ids), chunk_size)
+    ]
+    db_uri = db.engine.url.render_as_string(hide_password=False)
+
+    merged = {'diabetes_type': {}, 'bmi_category': {}}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(summarize_chunk, db_uri, chunk, since) for chunk in chunks]
+        for future in futures:
+            for dimension, by_group in future.result().items():
+                for group, stats in by_group.items():
+                    merged[dimension].setdefault(group, GroupStats()).merge(stats)
+
+    return {
+        dimension: {group: stats.to_dict() for group, stats in sorted(by_group.items())}
+        for dimension, by_group in merged.items()
+    }
+
+
+def refresh(window_days=WINDOW_DAYS, **kwargs):
+    """Compute and store a new snapshot; returns it."""
+    snapshot = AnalyticsSnapshot(
+        window_days=window_days,
+        payload=json.dumps(compute(window_days, **kwargs)),
+    )
+    db.session.add(snapshot)
+    db.session.commit()
+    logger.info('Stored analytics snapshot %s', snapshot.id)
+    return snapshot
+
+
+def latest():
+    return AnalyticsSnapshot.query.order_by(AnalyticsSnapshot.id.desc()).first()
@@ -1,20 +1,35 @@
 #!/usr/bin/env python3
 
 # Standard library imports
+import time
 
 # Remote library imports
-from flask import request
-from flask_restful import Resource
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from datetime import datetime
+import click
+from flask import request, send_file
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm import joinedload
+from flask_restful import Api, Resource
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
+from datetime import datetime, timedelta, timezone
 
 # Local imports
-from config import app, db, api
-from models import User, Reading, Medication, Meal, reading_meals
+from config import create_base_app, db
+from models import User, Reading, Medication, Meal, Alert, ReportJob, PurgeJob, reading_meals
+from sync import READING, MEDICATION, READING_MEAL, record_changes, changes_since
+from ingest import upsert_readings
+from alerts import engine as alert_engine, LOW, HIGH
+import forecast
+import reports
+import analytics
+import purge
+import ratelimit
+
+# Resources are collected here and bound to the app in create_app
+api = Api()
 
 # ---------------- Basic route ----------------
 
-@app.route('/')
 def index():
     return '<h1>Diabetes Management API</h1>'
 
@@ -67,7 +82,7 @@ class Login(Resource):
         
         user = User.query.filter_by(email=data['email']).first()
         
-        if user and user.authenticate(data['password']):
+        if user and user.deleting_at is None and user.authenticate(data['password']):
             access_token = create_access_token(identity=user.id)
             return {
                 'user': user.to_dict(),
@@ -100,6 +115,13 @@ def parse_time(time_str):
     # Expecting HH:MM
     return datetime.strptime(time_str, '%H:%M').time()
 
+def parse_source_ts(ts_str):
+    # Expecting ISO 8601; aware timestamps are stored as naive UTC
+    ts = datetime.fromisoformat(ts_str)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
 def validate_glucose_value(value):
     try:
         v = float(value)
@@ -164,18 +186,36 @@ def evaluate_glucose(value, context):
             status, color, suggestions = 'high', 'red', TIPS_HIGH
     return {'status': status, 'color': color, 'suggestions': suggestions}
 
+# ---------------- Streaming consumers ----------------
+def readings_committed(readings):
+    """Feed new readings to the alert engine and forecaster; returns fired alerts."""
+    forecast.engine.observe(readings)
+    return [a.to_dict() for a in alert_engine.process(readings)]
+
 # ---------------- Readings CRUD ----------------
 class Readings(Resource):
     @jwt_required()
     def get(self):
         user_id = get_jwt_identity()
-        items = Reading.query.filter_by(user_id=user_id).order_by(Reading.date, Reading.time).all()
+        query = Reading.query.filter_by(user_id=user_id)
+        # Optional [start, end) window, e.g. ?start=2025-01-01T22:00&end=2025-01-02T06:00
+        try:
+            if request.args.get('start'):
+                query = query.filter(Reading.taken_at >= datetime.fromisoformat(request.args['start']))
+            if request.args.get('end'):
+                query = query.filter(Reading.taken_at < datetime.fromisoformat(request.args['end']))
+        except ValueError:
+            return {'error': 'start and end must be ISO 8601 datetimes'}, 400
+        items = query.order_by(Reading.taken_at, Reading.id).all()
         return [r.to_dict() for r in items], 200
 
     @jwt_required()
     def post(self):
         user_id = get_jwt_identity()
         data = request.get_json()
+        if data.get('device_id') and data.get('source_ts'):
+            # Device readings are idempotent: retries must not duplicate rows
+            return upload_readings(user_id, data['device_id'], [data])
         required = ['value', 'date', 'time']
         if not all(k in data for k in required):
             return {'error': 'value, date (YYYY-MM-DD), and time (HH:MM) are required'}, 400
@@ -194,15 +234,43 @@ class Readings(Resource):
                 user_id=user_id,
             )
             db.session.add(reading)
+            db.session.flush()
+            record_changes(user_id, READING, [reading.id])
             db.session.commit()
             payload = reading.to_dict()
             if context:
                 payload['evaluation'] = evaluate_glucose(reading.value, context)
+            payload['alerts'] = readings_committed([reading])
             return payload, 201
         except Exception as e:
             db.session.rollback()
             return {'error': str(e)}, 400
 
+class ReadingForecast(Resource):
+    @jwt_required()
+    def get(self):
+        """30/60-minute glucose predictions from the latest reading."""
+        user_id = get_jwt_identity()
+        started = time.perf_counter()
+        predictions, based_on = forecast.engine.forecast(user_id)
+        compute_ms = (time.perf_counter() - started) * 1000.0
+        if not predictions:
+            return {'error': 'No readings to forecast from'}, 404
+        # An old reading says nothing about glucose now, let alone in an hour
+        if based_on < datetime.now() - forecast.MAX_TREND_GAP:
+            return {'error': 'No recent reading to forecast from', 'based_on': based_on.isoformat()}, 404
+        horizons = []
+        for minutes, value in predictions:
+            status = forecast.status_for(value)
+            horizons.append({
+                'minutes': minutes,
+                'at': (based_on + timedelta(minutes=minutes)).isoformat(),
+                'value': round(value, 1),
+                'status': status,
+                'warning': 'Predicted low: consider a small snack and recheck soon.' if status == 'low' else None,
+            })
+        return {'based_on': based_on.isoformat(), 'horizons': horizons, 'compute_ms': round(compute_ms, 3)}, 200
+
 class ReadingById(Resource):
     @jwt_required()
     def get(self, id):
@@ -237,6 +305,7 @@ class ReadingById(Resource):
                 return {'error': "context must be 'pre_meal' or 'post_meal'"}, 400
             reading.context = data['context']
         try:
+            record_changes(user_id, READING, [reading.id])
             db.session.commit()
             payload = reading.to_dict()
             if reading.context:
@@ -253,6 +322,9 @@ class ReadingById(Resource):
         if not reading:
             return {'error': 'Reading not found'}, 404
         try:
+            # Deleting the reading drops its meal links too; tombstone both
+            record_changes(user_id, READING_MEAL, [(reading.id, m.id) for m in reading.meals], deleted=True)
+            record_changes(user_id, READING, [reading.id], deleted=True)
             db.session.delete(reading)
             db.session.commit()
             return {}, 204
@@ -260,6 +332,72 @@ class ReadingById(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400
 
+# ---------------- Device uploads (idempotent) ----------------
+def device_reading(item):
+    """Validate one uploaded reading; returns (row, error)."""
+    if not isinstance(item, dict):
+        return None, 'each reading must be an object'
+    if 'value' not in item or not item.get('source_ts'):
+        return None, 'value and source_ts (ISO 8601) are required'
+    if not validate_glucose_value(item['value']):
+        return None, 'value must be a number between 40 and 500'
+    context = item.get('context')
+    if context and context not in ['pre_meal', 'post_meal']:
+        return None, "context must be 'pre_meal' or 'post_meal'"
+    try:
+        local_ts = datetime.fromisoformat(item['source_ts'])
+        return {
+            'value': float(item['value']),
+            # date/time default to the device's wall clock
+            'date': parse_date(item['date']) if item.get('date') else local_ts.date(),
+            'time': parse_time(item['time']) if item.get('time') else local_ts.time().replace(second=0, microsecond=0),
+            'notes': item.get('notes'),
+            'context': context,
+            'source_ts': parse_source_ts(item['source_ts']),
+        }, None
+    except (TypeError, ValueError) as e:
+        return None, str(e)
+
+def upload_readings(user_id, device_id, items):
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        row, error = device_reading(item)
+        if error:
+            errors.append({'index': index, 'error': error})
+        else:
+            rows.append(row)
+    try:
+        counts, written_ids = upsert_readings(user_id, str(device_id), rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 400
+    if written_ids:
+        written = Reading.query.filter(Reading.id.in_(written_ids)).all()
+        counts['alerts'] = readings_committed(written)
+    else:
+        counts['alerts'] = []
+    counts['errors'] = errors
+    return counts, 201 if counts['inserted'] else 200
+
+class ReadingUpload(Resource):
+    @jwt_required()
+    def post(self):
+        """Batch upload from a device: {device_id, readings: [{value, source_ts, ...}]}.
+
+        Re-sending an overlapping window is safe; rows that already match are
+        counted as skipped and not rewritten.
+        """
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        if not data or not data.get('device_id'):
+            return {'error': 'device_id is required'}, 400
+        items = data.get('readings')
+        if not isinstance(items, list):
+            return {'error': 'readings must be a list'}, 400
+        return upload_readings(user_id, data['device_id'], items)
+
 # ---------------- Profile + BMI ----------------
 class UserProfile(Resource):
     @jwt_required()
@@ -290,6 +428,55 @@ class UserProfile(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400
 
+    @jwt_required()
+    def delete(self):
+        """Queue deletion of the account and all its data; requires {password}."""
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        if not user:
+            return {'error': 'User not found'}, 404
+        data = request.get_json(silent=True) or {}
+        if not data.get('password') or not user.authenticate(data['password']):
+            return {'error': 'Password confirmation is required'}, 401
+        job, created = purge.enqueue(user)
+        # No more readings will arrive for this user; free their in-memory state
+        alert_engine.evict(user.id)
+        forecast.engine.evict(user.id)
+        return job.to_dict(), 202 if created else 200
+
+class UserPurge(Resource):
+    @jwt_required()
+    def get(self):
+        """Progress of the caller's latest account deletion."""
+        user_id = get_jwt_identity()
+        job = PurgeJob.query.filter_by(user_id=user_id).order_by(PurgeJob.id.desc()).first()
+        if not job:
+            return {'error': 'No account deletion requested'}, 404
+        return job.to_dict(), 200
+
+def block_deleting_accounts():
+    """Refuse writes from an account whose deletion is queued or running.
+
+    Otherwise rows written after the purge has passed their table would
+    outlive the user.
+    """
+    if request.method not in ratelimit.WRITE_METHODS:
+        return None
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        return None
+    if user_id is None:
+        return None
+    row = db.session.execute(select(User.deleting_at).where(User.id == user_id)).first()
+    # A token can outlive its account once the purge has removed the user row
+    if row is None:
+        return {'error': 'Account no longer exists'}, 401
+    if row.deleting_at is None:
+        return None
+    return {'error': 'This account is being deleted'}, 409
+
 class UserBMI(Resource):
     @jwt_required()
     def get(self):
@@ -297,19 +484,74 @@ class UserBMI(Resource):
         user = User.query.get(user_id)
         if not user:
             return {'error': 'User not found'}, 404
-        if not user.height_cm or not user.weight_kg:
+        result = user.bmi()
+        if result is None:
             return {'error': 'height_cm and weight_kg must be set on profile'}, 400
-        height_m = user.height_cm / 100.0
-        bmi = user.weight_kg / (height_m ** 2)
-        if bmi < 18.5:
-            category = 'Underweight'
-        elif bmi < 25:
-            category = 'Normal'
-        elif bmi < 30:
-            category = 'Overweight'
-        else:
-            category = 'Obese'
-        return {'bmi': round(bmi, 1), 'category': category}, 200
+        bmi, category = result
+        return {'bmi': bmi, 'category': category}, 200
+
+# ---------------- Dashboard (one round trip) ----------------
+class Dashboard(Resource):
+    @jwt_required()
+    def get(self):
+        """Everything the dashboard shows on load, in three queries.
+
+        1. the user with their medications (joined),
+        2. the latest ?readings=N readings (default 10),
+        3. one aggregate over the last 7 days.
+        """
+        user_id = get_jwt_identity()
+        limit = min(max(request.args.get('readings', 10, type=int), 0), 100)
+        user = (
+            User.query.options(joinedload(User.medications))
+            .filter(User.id == user_id)
+            .first()
+        )
+        if not user:
+            return {'error': 'User not found'}, 404
+
+        readings = (
+            Reading.query.filter_by(user_id=user_id)
+            .order_by(Reading.taken_at.desc(), Reading.id.desc())
+            .limit(limit)
+            .all()
+        )
+        latest = []
+        for r in readings:
+            payload = r.to_dict()
+            if r.context:
+                payload['evaluation'] = evaluate_glucose(r.value, r.context)
+            latest.append(payload)
+
+        count, mean, low, high, in_range = db.session.execute(
+            select(
+                func.count(Reading.id),
+                func.avg(Reading.value),
+                func.min(Reading.value),
+                func.max(Reading.value),
+                func.sum(case((Reading.value.between(LOW, HIGH), 1), else_=0)),
+            ).where(
+                Reading.user_id == user_id,
+                Reading.taken_at >= datetime.now() - timedelta(days=7),
+            )
+        ).one()
+
+        bmi = user.bmi()
+        medications = sorted(user.medications, key=lambda m: m.time)
+        return {
+            'user': user.to_dict(),
+            'education': education_for(user.diabetes_type),
+            'bmi': {'bmi': bmi[0], 'category': bmi[1]} if bmi else None,
+            'medications': [m.to_dict() for m in medications],
+            'readings': latest,
+            'stats_7d': {
+                'count': count,
+                'mean': round(mean, 1) if mean is not None else None,
+                'min': low,
+                'max': high,
+                'in_range_pct': round(100.0 * in_range / count, 1) if count else None,
+            },
+        }, 200
 
 # Add resources to API
 api.add_resource(Signup, '/signup')
@@ -317,8 +559,12 @@ api.add_resource(Login, '/login')
 api.add_resource(CheckSession, '/check_session')
 api.add_resource(Readings, '/readings')
 api.add_resource(ReadingById, '/readings/<int:id>')
+api.add_resource(ReadingUpload, '/readings/upload')
+api.add_resource(ReadingForecast, '/readings/forecast')
 api.add_resource(UserProfile, '/me')
 api.add_resource(UserBMI, '/me/bmi')
+api.add_resource(UserPurge, '/me/purge')
+api.add_resource(Dashboard, '/dashboard')
 
 # ---------------- Medications (create/read + update status) ----------------
 class Medications(Resource):
@@ -344,12 +590,91 @@ class Medications(Resource):
                 user_id=user_id,
             )
             db.session.add(med)
+            db.session.flush()
+            record_changes(user_id, MEDICATION, [med.id])
             db.session.commit()
             return med.to_dict(), 201
         except Exception as e:
             db.session.rollback()
             return {'error': str(e)}, 400
 
+    @jwt_required()
+    def patch(self):
+        """Set status and/or time on many medications with one UPDATE.
+
+        Targets are either {"ids": [...]} or {"filter": {"status": ..., "from":
+        "HH:MM", "to": "HH:MM"}} (time window inclusive; from after to wraps past
+        midnight), e.g. mark all morning meds taken, or reset everything to
+        pending at night.
+        """
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        values = {}
+        if 'status' in data:
+            if data['status'] not in ['pending', 'taken', 'missed']:
+                return {'error': "status must be 'pending', 'taken', or 'missed'"}, 400
+            values['status'] = data['status']
+        try:
+            if data.get('time'):
+                values['time'] = parse_time(data['time'])
+        except ValueError:
+            return {'error': 'time must be HH:MM'}, 400
+        if not values:
+            return {'error': 'status or time is required'}, 400
+
+        ids = data.get('ids')
+        criteria = data.get('filter')
+        if (ids is None) == (criteria is None):
+            return {'error': 'Provide either ids or filter'}, 400
+        conditions = [Medication.user_id == user_id]
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return {'error': 'ids must be a list of integers'}, 400
+            conditions.append(Medication.id.in_(ids))
+        else:
+            if not isinstance(criteria, dict):
+                return {'error': 'filter must be an object'}, 400
+            if criteria.get('status'):
+                if criteria['status'] not in ['pending', 'taken', 'missed']:
+                    return {'error': "filter status must be 'pending', 'taken', or 'missed'"}, 400
+                conditions.append(Medication.status == criteria['status'])
+            try:
+                start = parse_time(criteria['from']) if criteria.get('from') else None
+                end = parse_time(criteria['to']) if criteria.get('to') else None
+            except (TypeError, ValueError):
+                return {'error': 'filter from/to must be HH:MM'}, 400
+            if start is not None and end is not None and start > end:
+                # A window past midnight, e.g. 22:00-02:00
+                conditions.append(or_(Medication.time >= start, Medication.time <= end))
+            else:
+                if start is not None:
+                    conditions.append(Medication.time >= start)
+                if end is not None:
+                    conditions.append(Medication.time <= end)
+
+        try:
+            stmt = (
+                update(Medication)
+                .where(*conditions)
+                .values(**values)
+                .returning(Medication)
+                .execution_options(synchronize_session=False)
+            )
+            updated = db.session.scalars(stmt).all()
+            record_changes(user_id, MEDICATION, [m.id for m in updated])
+            # Serialize before commit expires the rows, which would reload each one
+            payload = [m.to_dict() for m in sorted(updated, key=lambda m: m.time)]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {'error': str(e)}, 400
+
+        errors = []
+        if ids is not None:
+            found = {m['id'] for m in payload}
+            errors = [{'id': i, 'error': 'Medication not found'} for i in ids if i not in found]
+        return {'updated': payload, 'errors': errors}, 200
+
 class MedicationById(Resource):
     @jwt_required()
     def patch(self, id):
@@ -369,6 +694,7 @@ class MedicationById(Resource):
         if 'dose' in data and data['dose']:
             med.dose = data['dose'].strip()
         try:
+            record_changes(user_id, MEDICATION, [med.id])
             db.session.commit()
             return med.to_dict(), 200
         except Exception as e:
@@ -426,6 +752,8 @@ class ReadingMeals(Resource):
         if not meal:
             return {'error': 'Meal not found'}, 404
         carbs_amount = data.get('carbs_amount')
+        if carbs_amount is not None and not isinstance(carbs_amount, (int, float)):
+            return {'error': 'carbs_amount must be a number'}, 400
         try:
             ins = reading_meals.insert().values(
                 reading_id=reading.id,
@@ -433,7 +761,9 @@ class ReadingMeals(Resource):
                 carbs_amount=carbs_amount,
             )
             db.session.execute(ins)
+            record_changes(user_id, READING_MEAL, [(reading.id, meal.id)])
             db.session.commit()
+            forecast.engine.add_carbs(reading.user_id, reading.taken_at, carbs_amount)
             return {'message': 'linked', 'reading_id': reading.id, 'meal_id': meal.id, 'carbs_amount': carbs_amount}, 201
         except Exception as e:
             db.session.rollback()
@@ -452,9 +782,13 @@ class ReadingMeals(Resource):
         try:
             delete_stmt = reading_meals.delete().where(
                 (reading_meals.c.reading_id == reading.id) & (reading_meals.c.meal_id == meal_id)
-            )
-            db.session.execute(delete_stmt)
+            ).returning(reading_meals.c.carbs_amount)
+            removed = db.session.execute(delete_stmt).scalars().all()
+            if removed:
+                record_changes(user_id, READING_MEAL, [(reading.id, meal_id)], deleted=True)
             db.session.commit()
+            carbs = sum(c for c in removed if c)
+            forecast.engine.add_carbs(reading.user_id, reading.taken_at, -carbs)
             return {}, 204
         except Exception as e:
             db.session.rollback()
@@ -462,6 +796,193 @@ class ReadingMeals(Resource):
 
 api.add_resource(ReadingMeals, '/readings/<int:reading_id>/meals')
 
+# ---------------- Alerts ----------------
+class Alerts(Resource):
+    @jwt_required()
+    def get(self):
+        """Most recent alerts first; ?limit=N (default 100)."""
+        user_id = get_jwt_identity()
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        alerts = (
+            Alert.query.filter_by(user_id=user_id)
+            .order_by(Alert.triggered_at.desc(), Alert.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [a.to_dict() for a in alerts], 200
+
+api.add_resource(Alerts, '/alerts')
+
+@click.command('replay-alerts')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+@with_appcontext
+def replay_alerts(user_id):
+    """Rebuild alert state and the alerts table from reading history."""
+    total = alert_engine.replay(user_id)
+    click.echo(f'Replayed alerts: {total} fired')
+
+@click.command('backtest-forecast')
+@click.option('--user-id', type=int, default=None, help='Only replay this user.')
+@with_appcontext
+def backtest_forecast(user_id):
+    """Score the forecaster on reading history against a persistence baseline."""
+    results = forecast.backtest(user_id)
+    for horizon, scores in results.items():
+        click.echo(f'{horizon} min: ' + ', '.join(f'{k}={v}' for k, v in scores.items()))
+    if any(scores['out_of_range'] for scores in results.values()):
+        low, high = forecast.PHYSIOLOGICAL_RANGE
+        raise click.ClickException(f'Forecasts left the {low}-{high} mg/dL range')
+
+# ---------------- Clinician reports (queued) ----------------
+class Reports(Resource):
+    @jwt_required()
+    def post(self):
+        """Queue a monthly report: {month: 'YYYY-MM', format: 'html'|'csv'}."""
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        if not user:
+            return {'error': 'User not found'}, 404
+        data = request.get_json() or {}
+        month = data.get('month') or datetime.utcnow().strftime('%Y-%m')
+        fmt = data.get('format') or 'html'
+        if fmt not in reports.FORMATS:
+            return {'error': "format must be 'html' or 'csv'"}, 400
+        try:
+            reports.month_bounds(month)
+        except ValueError:
+            return {'error': 'month must be YYYY-MM'}, 400
+        job, created = reports.enqueue(user, month, fmt)
+        if job is None:
+            return {'error': f'At most {reports.MAX_PENDING_PER_USER} reports can be pending'}, 429
+        return job.to_dict(), 202 if created else 200
+
+class ReportById(Resource):
+    @jwt_required()
+    def get(self, id):
+        """Job status; ?download=1 returns the file once the job is done."""
+        user_id = get_jwt_identity()
+        job = ReportJob.query.filter_by(id=id, user_id=user_id).first()
+        if not job:
+            return {'error': 'Report not found'}, 404
+        if request.args.get('download'):
+            if job.status != 'done':
+                return {'error': f'Report is {job.status}'}, 409
+            return send_file(
+                reports.artifact_path(job.artifact, job.format),
+                mimetype=reports.FORMATS[job.format],
+                as_attachment=True,
+                download_name=f'report-{job.month}.{job.format}',
+            )
+        payload = job.to_dict()
+        if job.status == 'done':
+            payload['download_url'] = f'/reports/{job.id}?download=1'
+        return payload, 200
+
+api.add_resource(Reports, '/reports')
+api.add_resource(ReportById, '/reports/<int:id>')
+
+@click.command('reports-worker')
+@click.option('--workers', type=int, default=reports.MAX_WORKERS, help='Reports rendered at once.')
+@click.option('--once', is_flag=True, help='Exit when the queue is empty.')
+@with_appcontext
+def reports_worker(workers, once):
+    """Process queued clinician reports."""
+    reports.run_worker(max_workers=workers, once=once)
+
+# ---------------- Clinic analytics (admin) ----------------
+class AdminAnalytics(Resource):
+    @jwt_required()
+    def get(self):
+        """Latest cohort snapshot by diabetes_type and BMI category."""
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        if not user or not user.is_admin:
+            return {'error': 'Admin access required'}, 403
+        snapshot = analytics.latest()
+        if not snapshot:
+            return {'error': 'No analytics snapshot yet; run flask refresh-analytics'}, 404
+        return snapshot.to_dict(), 200
+
+api.add_resource(AdminAnalytics, '/admin/analytics')
+
+@click.command('grant-admin')
+@click.argument('email')
+@click.option('--revoke', is_flag=True, help='Take admin access away instead.')
+@with_appcontext
+def grant_admin(email, revoke):
+    """Let an existing account read clinic analytics (or stop it)."""
+    # Signup does not verify addresses, so access is granted to an account, not an email
+    user = User.query.filter(func.lower(User.email) == email.strip().lower()).first()
+    if not user:
+        raise click.ClickException(f'No account with email {email}')
+    user.is_admin = not revoke
+    db.session.commit()
+    click.echo(f'{user.email}: admin {"revoked" if revoke else "granted"}')
+
+@click.command('refresh-analytics')
+@click.option('--days', type=int, default=analytics.WINDOW_DAYS, help='Window of readings to include.')
+@click.option('--workers', type=int, default=analytics.MAX_WORKERS, help='Processes summarizing user chunks.')
+@click.option('--every', type=int, default=0, help='Keep refreshing every N seconds.')
+@with_appcontext
+def refresh_analytics(days, workers, every):
+    """Recompute the cohort analytics snapshot."""
+    while True:
+        snapshot = analytics.refresh(days, max_workers=workers)
+        click.echo(f'Stored analytics snapshot {snapshot.id}')
+        if not every:
+            return
+        time.sleep(every)
+
+@click.command('purge-worker')
+@click.option('--chunk-size', type=int, default=purge.CHUNK_SIZE, help='Rows deleted per transaction.')
+@click.option('--once', is_flag=True, help='Exit when the queue is empty.')
+@with_appcontext
+def purge_worker(chunk_size, once):
+    """Process queued account deletions."""
+    purge.run_worker(chunk_size=chunk_size, once=once)
+
+# ---------------- Delta sync ----------------
+class Sync(Resource):
+    @jwt_required()
+    def get(self):
+        """Readings, medications and reading-meal links changed after ?since=<cursor>.
+
+        Start with since=0 (or omit it) and pass back the returned cursor on the
+        next call. Deleted objects come back as ids under 'deleted'.
+        """
+        user_id = get_jwt_identity()
+        since = request.args.get('since', 0, type=int)
+        if since < 0:
+            return {'error': 'since must be a non-negative integer'}, 400
+        return changes_since(user_id, since), 200
+
+api.add_resource(Sync, '/sync')
+
+# ---------------- App factory ----------------
+
+def create_app():
+    """Build the web app: database, migrations, JWT, CORS, REST API and CLI.
+
+    CORS and Flask-Migrate (which pulls in Alembic) are imported here, so
+    batch jobs built on config.create_base_app never load them. ``flask``
+    finds this factory through FLASK_APP=app.
+    """
+    from flask_cors import CORS
+    from flask_migrate import Migrate
+
+    app = create_base_app()
+    Migrate(app, db)
+    JWTManager(app)
+    CORS(app)
+    api.init_app(app)
+    app.add_url_rule('/', view_func=index)
+    for command in (replay_alerts, backtest_forecast, reports_worker, refresh_analytics, purge_worker, grant_admin):
+        app.cli.add_command(command)
+    # Per-identity token buckets and load shedding on write endpoints
+    ratelimit.init_app(app)
+    app.before_request(block_deleting_accounts)
+    return app
+
 if __name__ == '__main__':
-    app.run(port=5555, debug=True)
+    create_app().run(port=5555, debug=True)
 
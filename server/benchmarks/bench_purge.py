@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark purging a heavy account.
+
+Builds a scratch SQLite database with one user holding --readings readings
+(default 1,000,000, 10% of them linked to a meal) next to a small second
+user, runs the purge and reports total time plus the longest single write
+transaction, i.e. the longest time other writers could have been blocked.
+
+    python benchmarks/bench_purge.py [--readings N] [--chunk-size N]
+"""
+
+# Standard library imports
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readings', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_purge_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    # Local imports (after DATABASE_URL points at the scratch database)
+    from sqlalchemy import event, func, select
+    from config import create_base_app, db
+    from models import User, Reading, Meal, Medication, PurgeJob, reading_meals
+    import purge
+
+    chunk_size = args.chunk_size or purge.CHUNK_SIZE
+    app = create_base_app()
+    with app.app_context():
+        db.create_all()
+        heavy = User(name='heavy', email='heavy@example.com', _password_hash='x')
+        light = User(name='light', email='light@example.com', _password_hash='x')
+        meal = Meal(name='oats')
+        db.session.add_all([heavy, light, meal])
+        db.session.commit()
+        heavy_id, light_id, meal_id = heavy.id, light.id, meal.id
+
+        print(f'Loading {args.readings:,} readings ...')
+        start = datetime(2020, 1, 1)
+        batch = 50_000
+        for offset in range(0, args.readings, batch):
+            rows = []
+            for i in range(offset, min(offset + batch, args.readings)):
+                ts = start + timedelta(minutes=5 * i)
+                rows.append({'user_id': heavy_id, 'value': 100 + i % 120, 'date': ts.date(),
+                             'time': ts.time(), 'taken_at': ts})
+            db.session.execute(Reading.__table__.insert(), rows)
+        db.session.execute(reading_meals.insert().from_select(
+            ['reading_id', 'meal_id', 'carbs_amount'],
+            select(Reading.id, meal_id, 30.0).where(Reading.user_id == heavy_id, Reading.id % 10 == 0),
+        ))
+        db.session.add_all([
+            Medication(user_id=heavy_id, name=f'med{i}', dose='1', time=datetime(2020, 1, 1, i % 24).time())
+            for i in range(20)
+        ])
+        db.session.add_all([
+            Reading(user_id=light_id, value=110, date=start.date(), time=start.time()) for _ in range(100)
+        ])
+        db.session.commit()
+
+        job, _ = purge.enqueue(db.session.get(User, heavy_id))
+
+        # Time every write transaction: BEGIN ... COMMIT on the engine
+        longest = [0.0]
+        opened = {}
+
+        def on_begin(conn):
+            opened[id(conn)] = time.perf_counter()
+
+        def on_commit(conn):
+            began = opened.pop(id(conn), None)
+            if began is not None:
+                longest[0] = max(longest[0], time.perf_counter() - began)
+
+        event.listen(db.engine, 'begin', on_begin)
+        event.listen(db.engine, 'commit', on_commit)
+
+        print(f'Purging {job.total_rows:,} rows in chunks of {chunk_size:,} ...')
+        started = time.perf_counter()
+        purge.run_job(job.id, chunk_size)
+        elapsed = time.perf_counter() - started
+
+        job = db.session.get(PurgeJob, job.id)
+        remaining = db.session.execute(
+            select(func.count(Reading.id)).where(Reading.user_id == heavy_id)
+        ).scalar()
+        untouched = db.session.execute(
+            select(func.count(Reading.id)).where(Reading.user_id == light_id)
+        ).scalar()
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f'status={job.status} deleted_rows={job.deleted_rows:,} remaining={remaining} other_user_rows={untouched}')
+    print(f'total {elapsed:.2f}s, {job.deleted_rows / elapsed:,.0f} rows/s, '
+          f'longest transaction {longest[0] * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
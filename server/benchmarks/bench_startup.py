@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark cold starts of the web app and of batch jobs against a budget.
+
+Each target runs --runs times in a fresh interpreter. Reports the median
+wall time (interpreter start, imports and app construction), the top-level
+imports that cost the most according to one extra ``python -X importtime``
+run, and exits non-zero if a median goes over its budget or a target loads
+a module it must not (e.g. Alembic in a batch job).
+
+    python benchmarks/bench_startup.py [--runs N] [--batch-budget MS] [--web-budget MS]
+"""
+
+# Standard library imports
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.dirname(HERE)
+
+# What each kind of process does before it can start working
+TARGETS = {
+    # Seed scripts and one-off jobs: models on a database-only app
+    'batch': 'from config import create_base_app\nimport models\ncreate_base_app()',
+    # API server and flask CLI: everything
+    'web': 'from app import create_app\ncreate_app()',
+}
+# Median milliseconds allowed per target. Importing SQLAlchemy alone is most
+# of the batch budget; the web app adds Flask-Migrate/Alembic on top.
+BUDGETS = {'batch': 1200, 'web': 1800}
+# Modules only the web app needs; a batch job loading them is a regression
+WEB_ONLY = ['app', 'flask_migrate', 'alembic', 'flask_restful', 'flask_jwt_extended', 'flask_cors']
+FORBIDDEN = {'batch': WEB_ONLY, 'web': []}
+TOP_IMPORTS = 5
+
+
+def parse_importtime(stderr):
+    """({top-level module: cumulative microseconds}, every module imported)."""
+    totals, loaded = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        loaded.add(name.strip())
+        if not name.startswith('  '):
+            totals[name.strip()] = int(cumulative)
+    return totals, loaded
+
+
+def run_once(code, importtime=False):
+    """Seconds to run ``code`` in a new interpreter, plus its stderr."""
+    # In-memory database: building the app must not touch instance/
+    env = dict(os.environ, DATABASE_URL='sqlite://')
+    flags = ['-X', 'importtime'] if importtime else []
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *flags, '-c', code],
+        cwd=SERVER, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(f'Startup failed:\n{result.stderr[-2000:]}')
+    return elapsed, result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--batch-budget', type=float, default=BUDGETS['batch'], help='Milliseconds.')
+    parser.add_argument('--web-budget', type=float, default=BUDGETS['web'], help='Milliseconds.')
+    args = parser.parse_args()
+    budgets = {'batch': args.batch_budget, 'web': args.web_budget}
+
+    over = []
+    for target, code in TARGETS.items():
+        # Warm the OS file cache and bytecode so runs measure imports, not disk
+        _, stderr = run_once(code, importtime=True)
+        imports, loaded = parse_importtime(stderr)
+        timings = [run_once(code)[0] for _ in range(args.runs)]
+        median_ms = statistics.median(timings) * 1000
+        status = 'ok' if median_ms <= budgets[target] else 'OVER BUDGET'
+        print(f'{target}: median {median_ms:.0f} ms over {args.runs} runs '
+              f'(budget {budgets[target]:.0f} ms) {status}')
+        heaviest = sorted(imports.items(), key=lambda item: -item[1])
+        for name, micros in heaviest[:TOP_IMPORTS]:
+            print(f'    {micros / 1000:7.1f} ms  {name}')
+        if median_ms > budgets[target]:
+            over.append(target)
+        unwanted = [name for name in FORBIDDEN[target] if name in loaded]
+        if unwanted:
+            print(f'    loads web-only modules: {", ".join(unwanted)}')
+            over.append(target)
+
+    if over:
+        sys.exit(f'Startup over budget: {", ".join(over)}')
+
+
+if __name__ == '__main__':
+    main()
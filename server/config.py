@@ -1,36 +1,31 @@
 # Standard library imports
+import os
 
 # Remote library imports
 from flask import Flask
-from flask_cors import CORS
-from flask_migrate import Migrate
-from flask_restful import Api
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
 from sqlalchemy import MetaData
 
 # Local imports
 
-# Instantiate app, set attributes
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = 'your-secret-string'  # Change this in production!
-app.json.compact = False
-
-# Define metadata, instantiate db
+# Define metadata, instantiate db (bound to an app in create_base_app)
 metadata = MetaData(naming_convention={
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
 db = SQLAlchemy(metadata=metadata)
-migrate = Migrate(app, db)
-db.init_app(app)
 
-# Instantiate REST API
-api = Api(app)
 
-# Instantiate JWT manager
-jwt = JWTManager(app)
+def create_base_app():
+    """Flask app with only the database set up.
 
-# Instantiate CORS
-CORS(app)
+    This is the lightweight path for seed scripts and batch jobs: importing
+    config and models does not pull in Migrate/Alembic, JWT, CORS or the
+    REST API. The web app (app.create_app) builds on top of it.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = 'your-secret-string'  # Change this in production!
+    app.json.compact = False
+    db.init_app(app)
+    return app
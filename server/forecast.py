@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import math
+import threading
+from collections import deque
+from datetime import timedelta
+
+# Remote library imports
+from sqlalchemy import func, select
+
+# Local imports
+from config import db
+from models import Reading, reading_meals
+from alerts import LOW, HIGH
+from usercache import UserCache
+
+HORIZONS = (30, 60)  # minutes ahead
+# A reading within this distance of a horizon's target time counts as its outcome
+TOLERANCE = timedelta(minutes=5)
+# Readings further apart than this give no usable trend
+MAX_TREND_GAP = timedelta(minutes=30)
+# Weight of the newest rate in the exponentially smoothed trend
+TREND_SMOOTHING = 0.2
+CARBS_WINDOW = timedelta(hours=2)
+# Exponential forgetting: older samples weigh less, so the model tracks drift
+FORGETTING = 0.995
+PRIOR_VARIANCE = 1.0
+# Forgetting inflates the variance of features that stay at zero (no carbs
+# logged) without bound; cap each parameter's variance at the prior
+MAX_VARIANCE = PRIOR_VARIANCE
+# Forecasts outside this range (mg/dL) mean the model has gone unstable
+PHYSIOLOGICAL_RANGE = (20, 600)
+# History replayed for a user whose model is not in memory yet
+WARMUP_WINDOW = timedelta(days=2)
+MAX_USERS = 10000
+
+
+class RLS:
+    """Recursive least squares over a small feature vector (pure Python, O(k^2))."""
+
+    __slots__ = ('theta', 'P')
+
+    def __init__(self, theta):
+        self.theta = list(theta)
+        k = len(theta)
+        self.P = [[PRIOR_VARIANCE if i == j else 0.0 for j in range(k)] for i in range(k)]
+
+    def predict(self, x):
+        return sum(t * xi for t, xi in zip(self.theta, x))
+
+    def update(self, x, y):
+        k = len(x)
+        Px = [sum(self.P[i][j] * x[j] for j in range(k)) for i in range(k)]
+        denom = FORGETTING + sum(x[i] * Px[i] for i in range(k))
+        gain = [p / denom for p in Px]
+        error = y - self.predict(x)
+        self.theta = [t + g * error for t, g in zip(self.theta, gain)]
+        # Written out symmetrically: rounding in P - g Px^T otherwise makes P
+        # lose symmetry and definiteness over thousands of updates
+        P = [
+            [(self.P[i][j] - (gain[i] * Px[j] + gain[j] * Px[i]) / 2) / FORGETTING for j in range(k)]
+            for i in range(k)
+        ]
+        # Cap variances by rescaling as D P D (D diagonal), which keeps P positive definite
+        scale = [math.sqrt(MAX_VARIANCE / P[i][i]) if P[i][i] > MAX_VARIANCE else 1.0 for i in range(k)]
+        self.P = [[P[i][j] * scale[i] * scale[j] for j in range(k)] for i in range(k)]
+
+
+class UserForecaster:
+    """Per-user models for each horizon, trained as outcomes arrive.
+
+    Features at a reading: [1, value, smoothed trend (mg/dL per minute),
+    carbs in the last 2 hours]. Each reading queues its features; the reading that lands
+    near ``t + horizon`` supplies the target for one RLS update.
+    """
+
+    __slots__ = ('last_ts', 'last_value', 'trend', 'x', 'carbs', 'pending', 'models')
+
+    def __init__(self):
+        self.last_ts = None
+        self.last_value = None
+        self.trend = 0.0
+        self.x = None
+        self.carbs = deque()
+        self.pending = deque()
+        # Start from trend extrapolation: value + horizon * trend
+        self.models = [RLS([0.0, 1.0, float(h), 0.0]) for h in HORIZONS]
+
+    def observe(self, ts, value, carbs=0.0):
+        """Feed one reading in taken_at order.
+
+        Returns the outcomes it resolved as (horizon, predicted, actual,
+        value at prediction time) for backtesting.
+        """
+        scored = []
+        while self.pending and self.pending[0][0] < ts - TOLERANCE:
+            self.pending.popleft()
+        while self.pending and self.pending[0][0] <= ts + TOLERANCE:
+            _, index, x, predicted = self.pending.popleft()
+            self.models[index].update(x, value)
+            scored.append((HORIZONS[index], predicted, value, x[1]))
+
+        if self.last_ts is not None and timedelta(0) < ts - self.last_ts <= MAX_TREND_GAP:
+            rate = (value - self.last_value) / ((ts - self.last_ts).total_seconds() / 60.0)
+            self.trend += TREND_SMOOTHING * (rate - self.trend)
+        else:
+            self.trend = 0.0
+        trend = self.trend
+        if carbs:
+            self.carbs.append((ts, carbs))
+        while self.carbs and ts - self.carbs[0][0] > CARBS_WINDOW:
+            self.carbs.popleft()
+        self.x = [1.0, value, trend, sum(c for _, c in self.carbs)]
+
+        for index, horizon in enumerate(HORIZONS):
+            predicted = self.models[index].predict(self.x)
+            self.pending.append((ts + timedelta(minutes=horizon), index, self.x, predicted))
+        self.last_ts, self.last_value = ts, value
+        return scored
+
+    def add_carbs(self, ts, carbs):
+        """Count carbs linked to the reading at ``ts`` after it was observed.
+
+        Updates the carbs feature of the latest reading and of readings still
+        waiting for their outcome, as if the link had existed when they came in.
+        """
+        # Links older than the carbs window no longer touch any live feature
+        if self.last_ts is None or not carbs or not timedelta(0) <= self.last_ts - ts <= CARBS_WINDOW:
+            return
+        self.carbs = deque(sorted([*self.carbs, (ts, carbs)]))
+        features = {id(self.x): (self.last_ts, self.x)}
+        for target, index, x, _ in self.pending:
+            features[id(x)] = (target - timedelta(minutes=HORIZONS[index]), x)
+        for reading_ts, x in features.values():
+            if ts <= reading_ts <= ts + CARBS_WINDOW:
+                x[3] += carbs
+
+    def predict(self):
+        if self.x is None:
+            return []
+        return [(h, model.predict(self.x)) for h, model in zip(HORIZONS, self.models)]
+
+
+def readings_with_carbs(query):
+    """Add summed carbs_amount of linked meals to a Reading select."""
+    return (
+        query.add_columns(func.coalesce(func.sum(reading_meals.c.carbs_amount), 0.0))
+        .outerjoin(reading_meals, reading_meals.c.reading_id == Reading.id)
+        .group_by(Reading.id)
+    )
+
+
+class Forecaster:
+    """Keeps UserForecasters in memory and updates them as readings commit."""
+
+    def __init__(self, max_users=MAX_USERS):
+        self.users = UserCache(self.warm_up, max_users)
+        # Guards the models themselves; the cache has its own lock for the mapping
+        self.lock = threading.Lock()
+
+    def warm_up(self, user_id, before=None):
+        """Replay recent history into a new model (readings before ``before``, else all)."""
+        model = UserForecaster()
+        query = select(Reading.taken_at, Reading.value).where(Reading.user_id == user_id)
+        if before is None:
+            before = db.session.execute(
+                select(func.max(Reading.taken_at)).where(Reading.user_id == user_id)
+            ).scalar()
+            if before is None:
+                return model
+            query = query.where(Reading.taken_at <= before)
+        else:
+            query = query.where(Reading.taken_at < before)
+        query = readings_with_carbs(query.where(Reading.taken_at >= before - WARMUP_WINDOW))
+        for taken_at, value, carbs in db.session.execute(query.order_by(Reading.taken_at)):
+            model.observe(taken_at, value, carbs)
+        return model
+
+    def evict(self, user_id):
+        self.users.evict(user_id)
+
+    def observe(self, readings):
+        """Update models with newly committed readings."""
+        for reading in sorted(readings, key=lambda r: (r.user_id, r.taken_at)):
+            model = self.users.get(reading.user_id, reading.taken_at)
+            with self.lock:
+                if model.last_ts is not None and reading.taken_at <= model.last_ts:
+                    continue
+                model.observe(reading.taken_at, reading.value)
+
+    def add_carbs(self, user_id, taken_at, carbs):
+        """Apply a meal link (negative carbs for an unlink) committed on a reading."""
+        # Models not in memory pick the link up from the database when warmed
+        model = self.users.peek(user_id)
+        if model is not None:
+            with self.lock:
+                model.add_carbs(taken_at, carbs)
+
+    def forecast(self, user_id):
+        """[(minutes, predicted value)] from the latest reading, plus its time."""
+        # JWT identities may arrive as strings; models are keyed by Reading.user_id
+        user_id = int(user_id)
+        model = self.users.get(user_id)
+        with self.lock:
+            return model.predict(), model.last_ts
+
+
+def status_for(value):
+    if value < LOW:
+        return 'low'
+    if value > HIGH:
+        return 'high'
+    return 'normal'
+
+
+def backtest(user_id=None, batch_size=5000):
+    """Replay history through fresh models; MAE/RMSE per horizon against persistence.
+
+    The persistence baseline predicts that glucose stays at the current value.
+    ``out_of_range`` counts forecasts outside PHYSIOLOGICAL_RANGE and should be 0.
+    """
+    query = select(Reading.user_id, Reading.taken_at, Reading.value)
+    if user_id is not None:
+        query = query.where(Reading.user_id == user_id)
+    query = readings_with_carbs(query).order_by(Reading.user_id, Reading.taken_at)
+
+    errors = {
+        h: {'n': 0, 'abs': 0.0, 'sq': 0.0, 'base_abs': 0.0, 'base_sq': 0.0, 'out_of_range': 0}
+        for h in HORIZONS
+    }
+    low, high = PHYSIOLOGICAL_RANGE
+    models = {}
+    for uid, taken_at, value, carbs in db.session.execute(query.execution_options(yield_per=batch_size)):
+        model = models.get(uid)
+        if model is None:
+            # Users are streamed one after another; only the current one is kept
+            models = {uid: UserForecaster()}
+            model = models[uid]
+        for horizon, predicted, actual, current in model.observe(taken_at, value, carbs):
+            e = errors[horizon]
+            e['n'] += 1
+            e['abs'] += abs(predicted - actual)
+            e['sq'] += (predicted - actual) ** 2
+            e['base_abs'] += abs(current - actual)
+            e['base_sq'] += (current - actual) ** 2
+            if not low <= predicted <= high:
+                e['out_of_range'] += 1
+
+    result = {}
+    for horizon, e in errors.items():
+        n = e['n']
+        result[horizon] = {
+            'samples': n,
+            'mae': round(e['abs'] / n, 2) if n else None,
+            'rmse': round(math.sqrt(e['sq'] / n), 2) if n else None,
+            'baseline_mae': round(e['base_abs'] / n, 2) if n else None,
+            'baseline_rmse': round(math.sqrt(e['base_sq'] / n), 2) if n else None,
+            'out_of_range': e['out_of_range'],
+        }
+    return result
+
+
+engine = Forecaster()
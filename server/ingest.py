@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+from datetime import datetime
+
+# Remote library imports
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.sqlite import insert
+
+# Local imports
+from config import db
+from models import Reading
+from sync import READING, record_changes
+
+# Rows per INSERT statement; keeps bound parameters well under SQLite's limit
+CHUNK_SIZE = 500
+
+# What the device always sends; re-uploads overwrite these
+DEVICE_FIELDS = ['value', 'date', 'time', 'taken_at']
+# Often added by the user in the app afterwards; kept unless the upload has them
+OPTIONAL_FIELDS = ['notes', 'context']
+
+
+def upsert_readings(user_id, device_id, rows):
+    """Insert or update device readings keyed by (user_id, device_id, source_ts).
+
+    ``rows`` are validated dicts with value, date, time, notes, context and
+    source_ts. A row identical to the stored one is a no-op: the conflict
+    clause only updates when a field differs, so re-uploading an overlapping
+    window writes nothing. Missing notes/context leave the stored ones alone.
+    Returns (inserted/updated/skipped counts, written ids); the caller commits.
+    """
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    # Last write wins for duplicates inside the batch itself
+    by_ts = {}
+    for row in rows:
+        by_ts[row['source_ts']] = row
+    counts['skipped'] += len(rows) - len(by_ts)
+    rows = list(by_ts.values())
+
+    changed_ids = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        timestamps = [row['source_ts'] for row in chunk]
+        existing = set(db.session.execute(
+            select(Reading.source_ts).where(
+                Reading.user_id == user_id,
+                Reading.device_id == device_id,
+                Reading.source_ts.in_(timestamps),
+            )
+        ).scalars())
+
+        # Core INSERT skips ORM events, so stamp taken_at here
+        stmt = insert(Reading).values([
+            dict(row, user_id=user_id, device_id=device_id,
+                 taken_at=datetime.combine(row['date'], row['time']))
+            for row in chunk
+        ])
+        new = {field: stmt.excluded[field] for field in DEVICE_FIELDS}
+        new.update({
+            field: func.coalesce(stmt.excluded[field], getattr(Reading, field))
+            for field in OPTIONAL_FIELDS
+        })
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'device_id', 'source_ts'],
+            set_=new,
+            where=or_(*[getattr(Reading, field).is_distinct_from(value) for field, value in new.items()]),
+        ).returning(Reading.id, Reading.source_ts)
+
+        written = db.session.execute(stmt).all()
+        for reading_id, source_ts in written:
+            if source_ts in existing:
+                counts['updated'] += 1
+            else:
+                counts['inserted'] += 1
+            changed_ids.append(reading_id)
+        counts['skipped'] += len(chunk) - len(written)
+
+    record_changes(user_id, READING, changed_ids)
+    return counts, changed_ids
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy import DateTime
 from datetime import datetime
+import json
 import bcrypt
 
 from config import db
@@ -13,6 +14,21 @@ reading_meals = db.Table('reading_meals',
     db.Column('created_at', DateTime, default=datetime.utcnow)
 )
 
+def bmi_for(height_cm, weight_kg):
+    if not height_cm or not weight_kg:
+        return None
+    height_m = height_cm / 100.0
+    bmi = weight_kg / (height_m ** 2)
+    if bmi < 18.5:
+        category = 'Underweight'
+    elif bmi < 25:
+        category = 'Normal'
+    elif bmi < 30:
+        category = 'Overweight'
+    else:
+        category = 'Obese'
+    return round(bmi, 1), category
+
 # Users of the app
 class User(db.Model):
     __tablename__ = 'users'
@@ -27,6 +43,12 @@ class User(db.Model):
     height_cm = db.Column(db.Float, nullable=True)
     weight_kg = db.Column(db.Float, nullable=True)
     created_at = db.Column(DateTime, default=datetime.utcnow)
+    # Last change sequence handed out to this user's writes (see sync.py)
+    sync_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Set when account deletion is queued; from then on the account takes no writes
+    deleting_at = db.Column(DateTime, nullable=True)
+    # May read clinic-level analytics (/admin/analytics); set with flask grant-admin
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     
     # Relationships
     readings = db.relationship('Reading', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -47,6 +69,10 @@ class User(db.Model):
             password.encode('utf-8'),
             self._password_hash.encode('utf-8'))
     
+    def bmi(self):
+        """(bmi, category) from the profile, or None if height/weight are unset."""
+        return bmi_for(self.height_cm, self.weight_kg)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -61,14 +87,26 @@ class User(db.Model):
 
 class Reading(db.Model):  # Blood glucose reading
     __tablename__ = 'readings'
+    __table_args__ = (
+        # Device re-uploads hit this key and become no-ops (see ingest.py);
+        # manual readings leave both columns NULL and never collide
+        db.Index('uq_readings_user_id_device_id_source_ts',
+                 'user_id', 'device_id', 'source_ts', unique=True),
+        db.Index('ix_readings_user_id_taken_at', 'user_id', 'taken_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     value = db.Column(db.Float, nullable=False)  # Blood sugar value
     date = db.Column(db.Date, nullable=False)
     time = db.Column(db.Time, nullable=False)
+    # date + time in one sortable column; all reading queries order/range on it
+    taken_at = db.Column(DateTime, nullable=True)
     notes = db.Column(db.Text)
     # pre_meal or post_meal
     context = db.Column(db.String(20), nullable=True)
+    # Optional uploader identity (e.g. CGM serial) and the device's own timestamp
+    device_id = db.Column(db.String(64), nullable=True)
+    source_ts = db.Column(DateTime, nullable=True)
     created_at = db.Column(DateTime, default=datetime.utcnow)
     
     # Foreign key - belongs to User
@@ -85,6 +123,8 @@ class Reading(db.Model):  # Blood glucose reading
             'time': self.time.isoformat() if self.time else None,
             'notes': self.notes,
             'context': self.context,
+            'device_id': self.device_id,
+            'source_ts': self.source_ts.isoformat() if self.source_ts else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'user_id': self.user_id
         }
@@ -92,8 +132,17 @@ class Reading(db.Model):  # Blood glucose reading
     def __repr__(self):
         return f'<Reading {self.value} on {self.date}>'
 
+@db.event.listens_for(Reading, 'before_insert')
+@db.event.listens_for(Reading, 'before_update')
+def stamp_taken_at(mapper, connection, target):
+    if target.date and target.time:
+        target.taken_at = datetime.combine(target.date, target.time)
+
 class Medication(db.Model):  # Medication reminder
     __tablename__ = 'medications'
+    __table_args__ = (
+        db.Index('ix_medications_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -142,3 +191,160 @@ class Meal(db.Model):  # Logged meal
     
     def __repr__(self):
         return f'<Meal {self.name}>'
+
+class Change(db.Model):  # Sync journal: latest change of one object, per user
+    __tablename__ = 'changes'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'entity', 'entity_id', 'meal_id',
+                            name='uq_changes_user_id_entity_entity_id_meal_id'),
+        db.Index('ix_changes_user_id_seq', 'user_id', 'seq'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    # reading, medication or reading_meal
+    entity = db.Column(db.String(20), nullable=False)
+    # Reading/Medication id; for reading_meal the reading id
+    entity_id = db.Column(db.Integer, nullable=False)
+    # Meal id for reading_meal links, 0 otherwise (keeps the unique key non-NULL)
+    meal_id = db.Column(db.Integer, nullable=False, default=0)
+    # Tombstone: the object was deleted at this seq
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    
+    def __repr__(self):
+        return f'<Change {self.entity} {self.entity_id} seq={self.seq}>'
+
+class Alert(db.Model):  # Fired glucose alert (see alerts.py)
+    __tablename__ = 'alerts'
+    __table_args__ = (
+        db.Index('ix_alerts_user_id_triggered_at', 'user_id', 'triggered_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # rapid_drop, sustained_high or repeated_lows
+    kind = db.Column(db.String(30), nullable=False)
+    message = db.Column(db.String(200), nullable=False)
+    value = db.Column(db.Float, nullable=True)
+    # taken_at of the reading that fired it
+    triggered_at = db.Column(DateTime, nullable=False)
+    created_at = db.Column(DateTime, default=datetime.utcnow)
+    
+    # Foreign keys - belongs to User, fired by a Reading
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    reading_id = db.Column(db.Integer, db.ForeignKey('readings.id', ondelete='SET NULL'), nullable=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'message': self.message,
+            'value': self.value,
+            'triggered_at': self.triggered_at.isoformat() if self.triggered_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'reading_id': self.reading_id,
+            'user_id': self.user_id
+        }
+    
+    def __repr__(self):
+        return f'<Alert {self.kind} at {self.triggered_at}>'
+
+class ReportJob(db.Model):  # Queued clinician report (see reports.py)
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        db.Index('ix_report_jobs_status_id', 'status', 'id'),
+        db.Index('ix_report_jobs_input_key', 'input_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    format = db.Column(db.String(10), nullable=False)  # html or csv
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/done/failed
+    # Hash of everything the report depends on; identical requests reuse the job
+    input_key = db.Column(db.String(64), nullable=False)
+    # sha256 of the generated file, which is stored under that name
+    artifact = db.Column(db.String(64), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(DateTime, default=datetime.utcnow)
+    started_at = db.Column(DateTime, nullable=True)
+    finished_at = db.Column(DateTime, nullable=True)
+    # Renewed by the worker rendering the job; a stale one means that worker died
+    heartbeat_at = db.Column(DateTime, nullable=True)
+    
+    # Foreign key - belongs to User
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'month': self.month,
+            'format': self.format,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'user_id': self.user_id
+        }
+    
+    def __repr__(self):
+        return f'<ReportJob {self.id} {self.month} {self.status}>'
+
+class AnalyticsSnapshot(db.Model):  # Materialized cohort analytics (see analytics.py)
+    __tablename__ = 'analytics_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    window_days = db.Column(db.Integer, nullable=False)
+    # JSON document with the grouped statistics
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'window_days': self.window_days,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            **json.loads(self.payload)
+        }
+    
+    def __repr__(self):
+        return f'<AnalyticsSnapshot {self.id} at {self.created_at}>'
+
+class PurgeJob(db.Model):  # Account deletion in progress (see purge.py)
+    __tablename__ = 'purge_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Not a foreign key: the user row is the last thing the purge deletes
+    user_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/done/failed
+    step = db.Column(db.String(30), nullable=True)  # table currently being purged
+    total_rows = db.Column(db.Integer, nullable=False, default=0)  # estimate taken at request time
+    deleted_rows = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(DateTime, default=datetime.utcnow)
+    started_at = db.Column(DateTime, nullable=True)
+    finished_at = db.Column(DateTime, nullable=True)
+    
+    def to_dict(self):
+        if self.status == 'done':
+            progress = 100.0
+        elif self.total_rows:
+            progress = round(100.0 * min(self.deleted_rows, self.total_rows) / self.total_rows, 1)
+        else:
+            progress = 0.0
+        return {
+            'id': self.id,
+            'status': self.status,
+            'step': self.step,
+            'total_rows': self.total_rows,
+            'deleted_rows': self.deleted_rows,
+            'progress_pct': progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'user_id': self.user_id
+        }
+    
+    def __repr__(self):
+        return f'<PurgeJob {self.id} user={self.user_id} {self.status}>'
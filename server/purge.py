@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import logging
+import os
+import time
+from datetime import datetime
+
+# Remote library imports
+from sqlalchemy import delete, func, select, text, update
+
+# Local imports
+from config import db
+from models import User, Reading, Medication, Alert, Change, ReportJob, PurgeJob, reading_meals
+import reports
+
+logger = logging.getLogger(__name__)
+
+# Rows deleted per transaction; bounds how long the SQLite write lock is held
+CHUNK_SIZE = 5000
+POLL_INTERVAL = 1.0
+
+
+def enqueue(user):
+    """Return (job, created); a user has at most one purge in flight."""
+    existing = PurgeJob.query.filter(
+        PurgeJob.user_id == user.id,
+        PurgeJob.status.in_(['queued', 'running']),
+    ).first()
+    if existing:
+        return existing, False
+    readings = db.session.execute(
+        select(func.count(Reading.id)).where(Reading.user_id == user.id)
+    ).scalar()
+    links = db.session.execute(
+        select(func.count())
+        .select_from(reading_meals)
+        .join(Reading, Reading.id == reading_meals.c.reading_id)
+        .where(Reading.user_id == user.id)
+    ).scalar()
+    medications = db.session.execute(
+        select(func.count(Medication.id)).where(Medication.user_id == user.id)
+    ).scalar()
+    job = PurgeJob(user_id=user.id, status='queued', total_rows=readings + links + medications)
+    user.deleting_at = datetime.utcnow()
+    db.session.add(job)
+    db.session.commit()
+    return job, True
+
+
+def delete_in_chunks(job, step, model, condition, chunk_size, counted=True):
+    """Delete ``model`` rows matching ``condition`` one committed chunk at a time.
+
+    ``counted`` steps add to deleted_rows, matching what total_rows estimated.
+    """
+    while True:
+        # No ORDER BY: every matching row goes, and sorting by id would make
+        # SQLite sort the user's whole remaining index range for each chunk
+        ids = db.session.execute(select(model.id).where(condition).limit(chunk_size)).scalars().all()
+        if not ids:
+            return
+        deleted = 0
+        if model is Reading:
+            deleted += db.session.execute(
+                delete(reading_meals).where(reading_meals.c.reading_id.in_(ids))
+            ).rowcount
+        deleted += db.session.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        job.step = step
+        if counted:
+            job.deleted_rows += deleted
+        db.session.commit()
+
+
+def delete_owned(job, uid, chunk_size):
+    delete_in_chunks(job, 'alerts', Alert, Alert.user_id == uid, chunk_size, counted=False)
+    delete_in_chunks(job, 'readings', Reading, Reading.user_id == uid, chunk_size)
+    delete_in_chunks(job, 'medications', Medication, Medication.user_id == uid, chunk_size)
+    delete_in_chunks(job, 'sync journal', Change, Change.user_id == uid, chunk_size, counted=False)
+
+
+def purge(job, chunk_size=CHUNK_SIZE):
+    """Delete everything the user owns with set-based DELETEs, never loading rows.
+
+    Each chunk is its own short transaction, so other writers only wait for
+    one chunk. Safe to re-run after a crash: every step just finds fewer rows.
+    """
+    uid = job.user_id
+    # Jobs queued before users had the flag still stop new writes from here on
+    db.session.execute(
+        update(User).where(User.id == uid, User.deleting_at.is_(None)).values(deleting_at=datetime.utcnow())
+    )
+    db.session.commit()
+    delete_owned(job, uid, chunk_size)
+
+    # Report files are shared by content hash; drop only those no one else uses
+    artifacts = db.session.execute(
+        select(ReportJob.artifact, ReportJob.format)
+        .where(ReportJob.user_id == uid, ReportJob.artifact.isnot(None))
+        .distinct()
+    ).all()
+    delete_in_chunks(job, 'reports', ReportJob, ReportJob.user_id == uid, chunk_size, counted=False)
+    for digest, fmt in artifacts:
+        if not ReportJob.query.filter_by(artifact=digest).first():
+            try:
+                os.remove(reports.artifact_path(digest, fmt))
+            except FileNotFoundError:
+                pass
+
+    # A write that passed app.block_deleting_accounts just before the flag was set may have
+    # landed behind the first pass; this pass finds nothing in the usual case
+    delete_owned(job, uid, chunk_size)
+    job.step = 'user'
+    db.session.execute(delete(User).where(User.id == uid).execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def claim_next():
+    """Atomically move the oldest queued purge to running; returns its id."""
+    job_id = db.session.execute(text(
+        "UPDATE purge_jobs SET status = 'running', started_at = :now "
+        "WHERE id = (SELECT id FROM purge_jobs WHERE status = 'queued' ORDER BY id LIMIT 1) "
+        "RETURNING id"
+    ), {'now': datetime.utcnow()}).scalar()
+    db.session.commit()
+    return job_id
+
+
+def run_job(job_id, chunk_size=CHUNK_SIZE):
+    job = db.session.get(PurgeJob, job_id)
+    try:
+        purge(job, chunk_size)
+        job.status = 'done'
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Purge job %s failed', job_id)
+        job.status, job.error = 'failed', str(e)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def run_worker(chunk_size=CHUNK_SIZE, poll_interval=POLL_INTERVAL, once=False):
+    """Run queued purges one at a time so only one bulk delete competes for the writer."""
+    # Purges left running by a dead worker are resumed
+    db.session.execute(
+        update(PurgeJob).where(PurgeJob.status == 'running').values(status='queued')
+    )
+    db.session.commit()
+    while True:
+        job_id = claim_next()
+        if job_id is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job_id, chunk_size)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import math
+import threading
+import time
+
+# Remote library imports
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import event
+
+# Local imports
+from config import db
+
+# Token bucket per identity: RATE tokens per second, up to BURST
+RATE = 2.0
+BURST = 30.0
+WRITE_METHODS = {'POST', 'PATCH', 'PUT', 'DELETE'}
+# Cost per write, by Flask endpoint (flask-restful uses the lowercased class name)
+COSTS = {
+    'login': 10,  # bcrypt
+    'signup': 10,  # bcrypt
+    'readingupload': 5,
+}
+DEFAULT_COST = 1
+# Shed writes while the database is this slow (EWMA of statement time, seconds) ...
+MAX_DB_LATENCY = 0.25
+# ... or while this many write requests are already in flight
+MAX_IN_FLIGHT = 32
+SHED_RETRY_AFTER = 2
+LATENCY_SMOOTHING = 0.1
+# Ignore the latency signal once no statement has run for this long, so
+# shedding cannot keep itself going by stopping the writes that refresh it
+LATENCY_TTL = 5.0
+
+
+class RateLimiter:
+    """Token buckets kept in two generations of plain dicts.
+
+    A bucket idle for one generation (the time it takes to refill
+    completely) is full again, so forgetting it is lossless. Rotating the
+    generations drops all such buckets in O(1), which keeps memory bounded
+    by the identities seen in the last two generations.
+    """
+
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.generation = burst / rate
+        self.current = {}
+        self.previous = {}
+        self.rotated_at = None
+        self.lock = threading.Lock()
+
+    def take(self, key, cost, now=None):
+        """Spend ``cost`` tokens; returns 0 if allowed, else seconds until it would be."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.rotated_at is None:
+                self.rotated_at = now
+            elif now - self.rotated_at >= self.generation:
+                # Buckets left in previous sat idle a whole generation: full
+                # again, so drop them. If current idled too, drop it as well.
+                self.previous = self.current if now - self.rotated_at < 2 * self.generation else {}
+                self.current = {}
+                self.rotated_at = now
+            state = self.current.get(key)
+            if state is None:
+                state = self.previous.pop(key, None)
+            if state is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, state[0] + (now - state[1]) * self.rate)
+            if tokens >= cost:
+                self.current[key] = (tokens - cost, now)
+                return 0.0
+            self.current[key] = (tokens, now)
+            return (cost - tokens) / self.rate
+
+    def __len__(self):
+        return len(self.current) + len(self.previous)
+
+
+class LoadMonitor:
+    """Tracks write requests in flight and a smoothed database statement time."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.db_latency = 0.0
+        self.sampled_at = 0.0
+        self.lock = threading.Lock()
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # One slot per connection: a statement that raises never reaches
+        # after_cursor_execute, and the next one simply overwrites its start
+        conn.info['query_started'] = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        now = time.perf_counter()
+        started = conn.info.pop('query_started', None)
+        if started is None:
+            return
+        elapsed = now - started
+        with self.lock:
+            self.db_latency += LATENCY_SMOOTHING * (elapsed - self.db_latency)
+            self.sampled_at = now
+
+    def overloaded(self):
+        if self.in_flight >= MAX_IN_FLIGHT:
+            return True
+        return self.db_latency > MAX_DB_LATENCY and time.perf_counter() - self.sampled_at < LATENCY_TTL
+
+
+limiter = RateLimiter()
+monitor = LoadMonitor()
+
+
+def too_many(message, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def identity():
+    """JWT identity when a valid token is sent, else the client address."""
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        user_id = None
+    return f'user:{user_id}' if user_id is not None else f'ip:{request.remote_addr}'
+
+
+def before_request():
+    if request.method not in WRITE_METHODS:
+        return None
+    if monitor.overloaded():
+        return too_many('Server is busy, please retry shortly', SHED_RETRY_AFTER)
+    cost = COSTS.get(request.endpoint, DEFAULT_COST)
+    retry_after = limiter.take(identity(), cost)
+    if retry_after:
+        return too_many('Too many requests', retry_after)
+    with monitor.lock:
+        monitor.in_flight += 1
+    request.environ['ratelimit.counted'] = True
+    return None
+
+
+def teardown_request(exc):
+    if request.environ.pop('ratelimit.counted', False):
+        with monitor.lock:
+            monitor.in_flight -= 1
+
+
+def init_app(app):
+    """Install the limiter on write endpoints and start timing database statements."""
+    app.before_request(before_request)
+    app.teardown_request(teardown_request)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', monitor.before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', monitor.after_cursor_execute)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import csv
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+# Remote library imports
+from flask import current_app
+from sqlalchemy import or_, select, text, update
+
+# Local imports
+from config import db
+from models import User, Reading, Medication, ReportJob
+from alerts import LOW, HIGH
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'html': 'text/html', 'csv': 'text/csv'}
+# Jobs a user may have waiting or running at once
+MAX_PENDING_PER_USER = 3
+# Processes rendering reports at once
+MAX_WORKERS = 2
+POLL_INTERVAL = 1.0
+# A running job whose worker has not checked in for this long is requeued
+LEASE_TIMEOUT = timedelta(seconds=60)
+HEARTBEAT_INTERVAL = 10.0
+
+
+def reports_dir():
+    return os.path.join(current_app.instance_path, 'reports')
+
+
+def artifact_path(digest, fmt):
+    return os.path.join(reports_dir(), f'{digest}.{fmt}')
+
+
+def month_bounds(month):
+    """'YYYY-MM' -> [first day, first day of next month) as datetimes."""
+    start = datetime.strptime(month, '%Y-%m')
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+def input_key(user, month, fmt):
+    """Fingerprint of a report's inputs.
+
+    sync_seq moves on every reading/medication write, so an unchanged key
+    means a finished report for it can be served as is.
+    """
+    parts = [user.id, month, fmt, user.sync_seq, user.name,
+             user.diabetes_type, user.height_cm, user.weight_kg]
+    return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+
+# ---------------- Enqueue (request side) ----------------
+
+def enqueue(user, month, fmt):
+    """Return (job, created). Reuses a job with identical inputs."""
+    key = input_key(user, month, fmt)
+    existing = (
+        ReportJob.query
+        .filter(ReportJob.input_key == key, ReportJob.status != 'failed')
+        .order_by(ReportJob.id.desc())
+        .first()
+    )
+    if existing and (existing.status != 'done' or os.path.exists(artifact_path(existing.artifact, fmt))):
+        return existing, False
+    pending = ReportJob.query.filter(
+        ReportJob.user_id == user.id,
+        ReportJob.status.in_(['queued', 'running']),
+    ).count()
+    if pending >= MAX_PENDING_PER_USER:
+        return None, False
+    job = ReportJob(user_id=user.id, month=month, format=fmt, input_key=key, status='queued')
+    db.session.add(job)
+    db.session.commit()
+    return job, True
+
+
+# ---------------- Worker side ----------------
+
+def claim_next():
+    """Atomically move the oldest queued job to running; returns its id."""
+    job_id = db.session.execute(text(
+        "UPDATE report_jobs SET status = 'running', started_at = :now, heartbeat_at = :now "
+        "WHERE id = (SELECT id FROM report_jobs WHERE status = 'queued' ORDER BY id LIMIT 1) "
+        "RETURNING id"
+    ), {'now': datetime.utcnow()}).scalar()
+    db.session.commit()
+    return job_id
+
+
+def heartbeat(job_ids):
+    """Renew the lease on jobs this worker is still rendering."""
+    if job_ids:
+        db.session.execute(
+            update(ReportJob).where(ReportJob.id.in_(job_ids)).values(heartbeat_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+
+def requeue_stale():
+    """Put running jobs whose worker stopped renewing its lease back in the queue."""
+    stale = db.session.execute(
+        update(ReportJob)
+        .where(
+            ReportJob.status == 'running',
+            or_(ReportJob.heartbeat_at.is_(None), ReportJob.heartbeat_at < datetime.utcnow() - LEASE_TIMEOUT),
+        )
+        .values(status='queued', started_at=None, heartbeat_at=None)
+    ).rowcount
+    db.session.commit()
+    if stale:
+        logger.warning('Requeued %s report jobs from a dead worker', stale)
+
+
+def collect(job):
+    """Gather report inputs as plain data so rendering can run in a child process."""
+    user = db.session.get(User, job.user_id)
+    start, end = month_bounds(job.month)
+    readings = db.session.execute(
+        select(Reading.taken_at, Reading.value, Reading.context, Reading.notes)
+        .where(Reading.user_id == user.id, Reading.taken_at >= start, Reading.taken_at < end)
+        .order_by(Reading.taken_at)
+    ).all()
+    medications = Medication.query.filter_by(user_id=user.id).order_by(Medication.time).all()
+    bmi = user.bmi()
+    return {
+        'user': {'name': user.name, 'email': user.email, 'diabetes_type': user.diabetes_type},
+        'month': job.month,
+        'bmi': {'bmi': bmi[0], 'category': bmi[1]} if bmi else None,
+        'readings': [
+            {'taken_at': r.taken_at.isoformat(), 'value': r.value, 'context': r.context, 'notes': r.notes}
+            for r in readings
+        ],
+        'medications': [
+            {'name': m.name, 'dose': m.dose, 'time': m.time.strftime('%H:%M'), 'status': m.status}
+            for m in medications
+        ],
+    }
+
+
+def summarize(readings):
+    values = [r['value'] for r in readings]
+    if not values:
+        return {'count': 0, 'mean': None, 'min': None, 'max': None,
+                'in_range_pct': None, 'below_pct': None, 'above_pct': None}
+    n = len(values)
+    below = sum(1 for v in values if v < LOW)
+    above = sum(1 for v in values if v > HIGH)
+    return {
+        'count': n,
+        'mean': round(sum(values) / n, 1),
+        'min': min(values),
+        'max': max(values),
+        'in_range_pct': round(100.0 * (n - below - above) / n, 1),
+        'below_pct': round(100.0 * below / n, 1),
+        'above_pct': round(100.0 * above / n, 1),
+    }
+
+
+def esc(value):
+    return html.escape('' if value is None else str(value))
+
+
+def render_report(data, fmt):
+    """Build the report text; runs in a worker process, touches no database."""
+    stats = summarize(data['readings'])
+    adherence = {}
+    for med in data['medications']:
+        adherence[med['status']] = adherence.get(med['status'], 0) + 1
+    bmi = data['bmi']
+
+    if fmt == 'csv':
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['section', 'key', 'value'])
+        writer.writerow(['patient', 'name', data['user']['name']])
+        writer.writerow(['patient', 'diabetes_type', data['user']['diabetes_type'] or ''])
+        writer.writerow(['patient', 'month', data['month']])
+        writer.writerow(['bmi', 'bmi', bmi['bmi'] if bmi else ''])
+        writer.writerow(['bmi', 'category', bmi['category'] if bmi else ''])
+        for key, value in stats.items():
+            writer.writerow(['glucose', key, '' if value is None else value])
+        for status, count in sorted(adherence.items()):
+            writer.writerow(['medications', status, count])
+        writer.writerow([])
+        writer.writerow(['taken_at', 'value', 'context', 'notes'])
+        for r in data['readings']:
+            writer.writerow([r['taken_at'], r['value'], r['context'] or '', r['notes'] or ''])
+        return out.getvalue()
+
+    rows = ''.join(
+        f"<tr><td>{esc(r['taken_at'])}</td><td>{esc(r['value'])}</td><td>{esc(r['context'])}</td><td>{esc(r['notes'])}</td></tr>"
+        for r in data['readings']
+    )
+    meds = ''.join(
+        f"<tr><td>{esc(m['name'])}</td><td>{esc(m['dose'])}</td><td>{esc(m['time'])}</td><td>{esc(m['status'])}</td></tr>"
+        for m in data['medications']
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        f"<title>Report {esc(data['month'])} - {esc(data['user']['name'])}</title></head><body>"
+        f"<h1>{esc(data['user']['name'])} &mdash; {esc(data['month'])}</h1>"
+        f"<p>Diabetes type: {esc(data['user']['diabetes_type'])}</p>"
+        f"<p>BMI: {esc(bmi['bmi']) + ' (' + esc(bmi['category']) + ')' if bmi else 'not set'}</p>"
+        '<h2>Glucose</h2>'
+        f"<p>{stats['count']} readings, mean {esc(stats['mean'])} mg/dL "
+        f"(min {esc(stats['min'])}, max {esc(stats['max'])})</p>"
+        f"<p>Time in range {LOW}-{HIGH} mg/dL: {esc(stats['in_range_pct'])}% "
+        f"(below {esc(stats['below_pct'])}%, above {esc(stats['above_pct'])}%)</p>"
+        '<h2>Medications</h2>'
+        f"<p>{esc(', '.join(f'{s}: {c}' for s, c in sorted(adherence.items())))}</p>"
+        f'<table><tr><th>Name</th><th>Dose</th><th>Time</th><th>Status</th></tr>{meds}</table>'
+        '<h2>Readings</h2>'
+        f'<table><tr><th>Taken at</th><th>Value</th><th>Context</th><th>Notes</th></tr>{rows}</table>'
+        '</body></html>'
+    )
+
+
+def store_artifact(content, fmt):
+    """Write content under its sha256; identical reports share one file."""
+    data = content.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    path = artifact_path(digest, fmt)
+    if not os.path.exists(path):
+        os.makedirs(reports_dir(), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    return digest
+
+
+def finish(job_id, future):
+    job = db.session.get(ReportJob, job_id)
+    try:
+        job.artifact = store_artifact(future.result(), job.format)
+        job.status = 'done'
+    except Exception as e:
+        logger.exception('Report job %s failed', job_id)
+        job.status, job.error = 'failed', str(e)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def run_worker(max_workers=MAX_WORKERS, poll_interval=POLL_INTERVAL, once=False):
+    """Claim queued jobs and render them in a process pool.
+
+    Data is gathered here and rendering happens in the pool, so at most
+    ``max_workers`` reports are built at once. With ``once`` the worker
+    exits when the queue is empty.
+    """
+    # app.py imports this module at startup; only run_worker pays for the pool import
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    # Jobs of a dead worker go back to the queue; those of live workers keep their lease
+    requeue_stale()
+    checked_in = time.monotonic()
+    running = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            if time.monotonic() - checked_in >= HEARTBEAT_INTERVAL:
+                heartbeat(list(running.values()))
+                requeue_stale()
+                checked_in = time.monotonic()
+            while len(running) < max_workers:
+                job_id = claim_next()
+                if job_id is None:
+                    break
+                job = db.session.get(ReportJob, job_id)
+                try:
+                    data = collect(job)
+                except Exception as e:
+                    logger.exception('Report job %s failed', job_id)
+                    job.status, job.error, job.finished_at = 'failed', str(e), datetime.utcnow()
+                    db.session.commit()
+                    continue
+                running[pool.submit(render_report, data, job.format)] = job_id
+            if not running:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                finish(running.pop(future), future)
@@ -7,11 +7,12 @@ from random import randint, choice as rc
 from faker import Faker
 
 # Local imports
-from app import app
+from config import create_base_app
 from models import db
 
 if __name__ == '__main__':
     fake = Faker()
+    app = create_base_app()
     with app.app_context():
         print("Starting seed...")
         # Seed code goes here!
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+
+# Remote library imports
+from sqlalchemy import and_, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+# Local imports
+from config import db
+from models import User, Reading, Medication, Change, reading_meals
+
+# Journal entities
+READING = 'reading'
+MEDICATION = 'medication'
+READING_MEAL = 'reading_meal'
+
+
+def next_seq(user_id):
+    """Bump and return the user's change sequence inside the current transaction."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(sync_seq=User.sync_seq + 1)
+    )
+    return db.session.execute(
+        select(User.sync_seq).where(User.id == user_id)
+    ).scalar_one()
+
+
+def record_changes(user_id, entity, keys, deleted=False):
+    """Stamp objects with one new seq; call before the write is committed.
+
+    ``keys`` are object ids, or (reading_id, meal_id) pairs for READING_MEAL.
+    Each object keeps a single journal row, so the journal grows with the
+    number of live objects, not with the number of edits.
+    """
+    keys = list(keys)
+    if not keys:
+        return None
+    seq = next_seq(user_id)
+    rows = []
+    for key in keys:
+        entity_id, meal_id = key if entity == READING_MEAL else (key, 0)
+        rows.append({
+            'user_id': user_id,
+            'seq': seq,
+            'entity': entity,
+            'entity_id': entity_id,
+            'meal_id': meal_id,
+            'deleted': deleted,
+        })
+    stmt = insert(Change).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'entity', 'entity_id', 'meal_id'],
+        set_={'seq': stmt.excluded.seq, 'deleted': stmt.excluded.deleted},
+    )
+    db.session.execute(stmt)
+    return seq
+
+
+def changes_since(user_id, since):
+    """Everything that changed for the user after ``since``.
+
+    Every query starts from the (user_id, seq) index on the journal, so the
+    cost follows the size of the change set, not the size of the history.
+    """
+    # Fix the upper bound first: a write committed while we read lands in the
+    # next sync instead of being skipped by a cursor that already covers it.
+    cursor = db.session.execute(
+        select(db.func.max(Change.seq)).where(Change.user_id == user_id, Change.seq > since)
+    ).scalar()
+    if cursor is None:
+        return {
+            'cursor': since,
+            'readings': [],
+            'medications': [],
+            'reading_meals': [],
+            'deleted': {'readings': [], 'medications': [], 'reading_meals': []},
+        }
+    recent = and_(Change.user_id == user_id, Change.seq > since, Change.seq <= cursor)
+
+    readings = (
+        Reading.query
+        .join(Change, and_(Change.entity == READING, Change.entity_id == Reading.id))
+        .filter(recent, Change.deleted.is_(False))
+        .all()
+    )
+    medications = (
+        Medication.query
+        .join(Change, and_(Change.entity == MEDICATION, Change.entity_id == Medication.id))
+        .filter(recent, Change.deleted.is_(False))
+        .all()
+    )
+    links = db.session.execute(
+        select(reading_meals)
+        .join(Change, and_(
+            Change.entity == READING_MEAL,
+            Change.entity_id == reading_meals.c.reading_id,
+            Change.meal_id == reading_meals.c.meal_id,
+        ))
+        .where(recent, Change.deleted.is_(False))
+    ).mappings().all()
+    tombstones = Change.query.filter(recent, Change.deleted.is_(True)).all()
+
+    deleted = {'readings': [], 'medications': [], 'reading_meals': []}
+    for t in tombstones:
+        if t.entity == READING:
+            deleted['readings'].append(t.entity_id)
+        elif t.entity == MEDICATION:
+            deleted['medications'].append(t.entity_id)
+        else:
+            deleted['reading_meals'].append({'reading_id': t.entity_id, 'meal_id': t.meal_id})
+
+    return {
+        'cursor': cursor,
+        'readings': [r.to_dict() for r in readings],
+        'medications': [m.to_dict() for m in medications],
+        'reading_meals': [link_to_dict(link) for link in links],
+        'deleted': deleted,
+    }
+
+
+def link_to_dict(link):
+    return {
+        'reading_id': link['reading_id'],
+        'meal_id': link['meal_id'],
+        'carbs_amount': link['carbs_amount'],
+        'created_at': link['created_at'].isoformat() if link['created_at'] else None,
+    }
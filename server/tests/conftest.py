@@ -0,0 +1,68 @@
+# Standard library imports
+import os
+import sys
+
+# Remote library imports
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER)
+# Every test gets a fresh in-memory database
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+# Local imports
+from app import create_app
+from config import db
+from models import User
+from alerts import engine as alert_engine
+import forecast
+import ratelimit
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    # In-memory caches outlive the database; start every test cold
+    alert_engine.windows.clear()
+    forecast.engine.users.clear()
+    ratelimit.limiter = ratelimit.RateLimiter()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(name='Pat', email='pat@example.com')
+    user.password_hash = 'secret'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements run while the test is active; clear it before the part under test."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
@@ -0,0 +1,64 @@
+# Standard library imports
+from datetime import datetime, timedelta
+
+# Remote library imports
+from sqlalchemy import event
+
+# Local imports
+from config import db
+from models import Alert, Reading
+from alerts import UserWindow, engine as alert_engine
+
+START = datetime(2026, 1, 1, 8)
+
+
+def feed(window, values, step=timedelta(minutes=5)):
+    fired = []
+    for i, value in enumerate(values):
+        fired += [kind for kind, _ in window.update(START + i * step, value)]
+    return fired
+
+
+def test_rapid_drop_fires_once_per_continuous_fall():
+    window = UserWindow()
+    # 45 minutes falling 3 mg/dL per minute
+    assert feed(window, [250 - 15 * i for i in range(10)]) == ['rapid_drop']
+
+
+def test_rapid_drop_fires_again_after_the_rate_recovers():
+    window = UserWindow()
+    values = [250, 235, 220, 220, 220, 205, 190]
+    assert feed(window, values) == ['rapid_drop', 'rapid_drop']
+
+
+def test_replay_commits_page_by_page(user):
+    values = [250 - 15 * i for i in range(10)] + [60, 65, 200, 60]
+    db.session.add_all([
+        Reading(user_id=user.id, value=value, date=(START + i * timedelta(minutes=5)).date(),
+                time=(START + i * timedelta(minutes=5)).time())
+        for i, value in enumerate(values)
+    ])
+    # Stale alert of a user with no readings left
+    db.session.add(Alert(user_id=999, kind='rapid_drop', message='old', value=1, triggered_at=START))
+    db.session.commit()
+
+    commits = []
+    event.listen(db.engine, 'commit', lambda conn: commits.append(conn))
+    total = alert_engine.replay(batch_size=4)
+
+    assert total == 3
+    kinds = sorted(db.session.scalars(db.select(Alert.kind)))
+    assert kinds == ['rapid_drop', 'rapid_drop', 'repeated_lows']
+    # One for the orphan cleanup, then one per page of four readings
+    assert len(commits) == 1 + 4
+
+
+def test_alert_limit_is_clamped(client, user, auth_headers):
+    db.session.add_all([
+        Alert(user_id=user.id, kind='rapid_drop', message=str(i), value=100, triggered_at=START + timedelta(hours=i))
+        for i in range(3)
+    ])
+    db.session.commit()
+    assert len(client.get('/alerts?limit=-1', headers=auth_headers).get_json()) == 1
+    assert len(client.get('/alerts?limit=0', headers=auth_headers).get_json()) == 1
+    assert len(client.get('/alerts?limit=2', headers=auth_headers).get_json()) == 2
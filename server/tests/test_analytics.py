@@ -0,0 +1,32 @@
+# Remote library imports
+from flask_jwt_extended import create_access_token
+
+# Local imports
+from config import db
+from models import User
+from app import grant_admin
+
+
+def test_analytics_requires_an_admin_account(app, client, user, auth_headers):
+    # Signing up with any address, e.g. a clinic's, grants nothing
+    response = client.post('/signup', json={'name': 'Eve', 'email': 'ADMIN@clinic.org', 'password': 'x'})
+    assert response.status_code == 201
+    eve = {'Authorization': f'Bearer {create_access_token(identity=str(response.get_json()["user"]["id"]))}'}
+    assert client.get('/admin/analytics', headers=eve).status_code == 403
+    assert client.get('/admin/analytics', headers=auth_headers).status_code == 403
+
+    result = app.test_cli_runner().invoke(grant_admin, ['PAT@example.com'])
+    assert result.exit_code == 0, result.output
+    assert db.session.get(User, user.id).is_admin
+    # Allowed now; 404 only because no snapshot has been computed yet
+    assert client.get('/admin/analytics', headers=auth_headers).status_code == 404
+
+    result = app.test_cli_runner().invoke(grant_admin, ['pat@example.com', '--revoke'])
+    assert result.exit_code == 0
+    assert client.get('/admin/analytics', headers=auth_headers).status_code == 403
+
+
+def test_grant_admin_needs_an_existing_account(app):
+    result = app.test_cli_runner().invoke(grant_admin, ['nobody@example.com'])
+    assert result.exit_code != 0
+    assert 'No account' in result.output
@@ -0,0 +1,32 @@
+# Standard library imports
+from datetime import datetime, time, timedelta
+
+# Local imports
+from config import db
+from models import Medication, Reading
+
+
+def test_dashboard_runs_three_statements(client, user, auth_headers, statements):
+    user.height_cm, user.weight_kg = 180, 80
+    db.session.add_all([
+        Medication(user_id=user.id, name=f'med{i}', dose='1', time=time(8 + i)) for i in range(3)
+    ])
+    now = datetime.now()
+    db.session.add_all([
+        Reading(user_id=user.id, value=100 + i, date=(now - timedelta(hours=i)).date(),
+                time=(now - timedelta(hours=i)).time(), context='pre_meal' if i % 2 else None)
+        for i in range(20)
+    ])
+    db.session.commit()
+    db.session.expire_all()
+
+    statements.clear()
+    response = client.get('/dashboard', headers=auth_headers)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [m['name'] for m in data['medications']] == ['med0', 'med1', 'med2']
+    assert len(data['readings']) == 10
+    assert data['stats_7d']['count'] == 20
+    assert data['bmi'] == {'bmi': 24.7, 'category': 'Normal'}
+    assert len(statements) == 3, statements
@@ -0,0 +1,106 @@
+# Standard library imports
+import math
+import random
+from datetime import datetime, timedelta
+
+# Local imports
+from config import db
+from models import Meal, Reading, reading_meals
+import forecast
+
+START = datetime(2026, 1, 1)
+
+
+def cgm_trace(n, period=40, seed=1):
+    """Five-minute readings swinging around 140 mg/dL plus sensor noise."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield START + timedelta(minutes=5 * i), 140 + 50 * math.sin(i / period) + rng.gauss(0, 5)
+
+
+def in_range(predictions):
+    low, high = forecast.PHYSIOLOGICAL_RANGE
+    return all(low <= value <= high for _, value in predictions)
+
+
+def test_covariance_stays_bounded_without_carbs():
+    model = forecast.UserForecaster()
+    for ts, value in cgm_trace(20000):
+        model.observe(ts, value)
+    for rls in model.models:
+        assert all(rls.P[i][i] <= forecast.MAX_VARIANCE for i in range(len(rls.P)))
+
+    # A first meal after weeks without any must not throw the forecast off
+    ts += timedelta(minutes=5)
+    model.observe(ts, 130, carbs=50)
+    assert in_range(model.predict())
+    for _ in range(36):
+        ts += timedelta(minutes=5)
+        model.observe(ts, 130 + 40 * math.sin(_ / 12))
+        assert in_range(model.predict())
+
+
+def test_backtest_forecasts_stay_in_physiological_range(user):
+    meal = Meal(name='oats')
+    db.session.add(meal)
+    db.session.flush()
+    rows = [
+        {'user_id': user.id, 'value': value, 'date': ts.date(), 'time': ts.time(), 'taken_at': ts}
+        for ts, value in cgm_trace(3000, period=24)
+    ]
+    db.session.execute(Reading.__table__.insert(), rows)
+    # A meal roughly three times a day
+    db.session.execute(reading_meals.insert().from_select(
+        ['reading_id', 'meal_id', 'carbs_amount'],
+        db.select(Reading.id, meal.id, 45.0).where(Reading.id % 96 == 0),
+    ))
+    db.session.commit()
+
+    for horizon, scores in forecast.backtest(user.id).items():
+        assert scores['samples'] > 2900
+        assert scores['out_of_range'] == 0
+        assert scores['mae'] < scores['baseline_mae']
+
+
+def test_linking_carbs_updates_live_features(client, user, auth_headers):
+    for i in range(6):
+        ts = START + timedelta(minutes=5 * i)
+        response = client.post('/readings', headers=auth_headers, json={
+            'value': 120 + i, 'date': ts.date().isoformat(), 'time': ts.strftime('%H:%M'),
+        })
+        assert response.status_code == 201
+    reading_id = response.get_json()['id']
+    meal_id = client.post('/meals', headers=auth_headers, json={'name': 'toast'}).get_json()['id']
+    model = forecast.engine.users.peek(user.id)
+    assert model.x[3] == 0
+
+    response = client.post(f'/readings/{reading_id}/meals', headers=auth_headers,
+                           json={'meal_id': meal_id, 'carbs_amount': 50})
+    assert response.status_code == 201
+    assert model.x[3] == 50
+    # Readings still waiting for their outcome see the carbs from then on
+    assert all(x[3] == 50 for target, _, x, _ in model.pending
+               if target - timedelta(minutes=60) >= START + timedelta(minutes=25))
+
+    response = client.delete(f'/readings/{reading_id}/meals?meal_id={meal_id}', headers=auth_headers)
+    assert response.status_code == 204
+    assert model.x[3] == 0
+
+
+def test_forecast_needs_a_recent_reading(client, auth_headers):
+    now = datetime.now().replace(second=0, microsecond=0)
+    for minutes in (60, 55):
+        ts = now - timedelta(minutes=minutes)
+        client.post('/readings', headers=auth_headers, json={
+            'value': 120, 'date': ts.date().isoformat(), 'time': ts.strftime('%H:%M'),
+        })
+    response = client.get('/readings/forecast', headers=auth_headers)
+    assert response.status_code == 404
+    assert response.get_json()['based_on'] == (now - timedelta(minutes=55)).isoformat()
+
+    client.post('/readings', headers=auth_headers, json={
+        'value': 118, 'date': now.date().isoformat(), 'time': now.strftime('%H:%M'),
+    })
+    response = client.get('/readings/forecast', headers=auth_headers)
+    assert response.status_code == 200
+    assert [h['minutes'] for h in response.get_json()['horizons']] == list(forecast.HORIZONS)
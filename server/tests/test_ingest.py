@@ -0,0 +1,74 @@
+# Standard library imports
+from datetime import datetime
+
+# Local imports
+from config import db
+from models import Reading
+
+
+def upload(client, headers, readings, device_id='cgm-1'):
+    response = client.post('/readings/upload', headers=headers, json={'device_id': device_id, 'readings': readings})
+    return response.status_code, response.get_json()
+
+
+def counts(data):
+    return {key: data[key] for key in ('inserted', 'updated', 'skipped')}
+
+
+FIRST = datetime(2026, 1, 1, 8)
+WINDOW = [
+    {'value': 110, 'source_ts': '2026-01-01T08:00:00'},
+    {'value': 125, 'source_ts': '2026-01-01T08:05:00'},
+    {'value': 140, 'source_ts': '2026-01-01T08:10:00'},
+]
+
+
+def test_repeated_upload_is_a_no_op(client, auth_headers):
+    assert upload(client, auth_headers, WINDOW)[0] == 201
+    status, data = upload(client, auth_headers, WINDOW)
+    assert status == 200
+    assert counts(data) == {'inserted': 0, 'updated': 0, 'skipped': 3}
+
+
+def test_changed_and_new_readings_are_counted(client, auth_headers):
+    upload(client, auth_headers, WINDOW)
+    changed = [dict(WINDOW[0], value=112), WINDOW[1], WINDOW[2], {'value': 150, 'source_ts': '2026-01-01T08:15:00'}]
+    status, data = upload(client, auth_headers, changed)
+    assert status == 201
+    assert counts(data) == {'inserted': 1, 'updated': 1, 'skipped': 2}
+    assert db.session.scalar(db.select(Reading.value).where(Reading.source_ts == FIRST)) == 112
+
+
+def test_in_batch_duplicates_keep_the_last_row(client, auth_headers):
+    batch = [WINDOW[0], dict(WINDOW[0], value=118), WINDOW[1]]
+    status, data = upload(client, auth_headers, batch)
+    assert status == 201
+    assert counts(data) == {'inserted': 2, 'updated': 0, 'skipped': 1}
+    assert db.session.scalar(db.select(db.func.count(Reading.id))) == 2
+    assert db.session.scalar(db.select(Reading.value).where(Reading.source_ts == FIRST)) == 118
+
+
+def test_same_timestamp_from_another_device_is_a_new_reading(client, auth_headers):
+    upload(client, auth_headers, WINDOW)
+    status, data = upload(client, auth_headers, WINDOW[:1], device_id='meter-2')
+    assert counts(data) == {'inserted': 1, 'updated': 0, 'skipped': 0}
+
+
+def test_reupload_keeps_notes_and_context_edited_in_the_app(client, auth_headers):
+    upload(client, auth_headers, WINDOW)
+    reading_id = db.session.scalar(db.select(Reading.id).where(Reading.source_ts == FIRST))
+    response = client.patch(f'/readings/{reading_id}', headers=auth_headers,
+                            json={'notes': 'after pizza', 'context': 'post_meal'})
+    assert response.status_code == 200
+
+    status, data = upload(client, auth_headers, WINDOW)
+    assert counts(data) == {'inserted': 0, 'updated': 0, 'skipped': 3}
+    db.session.expire_all()
+    reading = db.session.get(Reading, reading_id)
+    assert (reading.notes, reading.context) == ('after pizza', 'post_meal')
+
+    # A device that does send notes still updates them
+    status, data = upload(client, auth_headers, [dict(WINDOW[0], notes='sensor warm-up')])
+    assert counts(data) == {'inserted': 0, 'updated': 1, 'skipped': 0}
+    db.session.expire_all()
+    assert db.session.get(Reading, reading_id).notes == 'sensor warm-up'
@@ -0,0 +1,53 @@
+# Standard library imports
+from datetime import time
+
+# Local imports
+from config import db
+from models import Medication
+
+
+def test_bulk_patch_does_not_reload_rows(client, user, auth_headers, statements):
+    medications = [
+        Medication(user_id=user.id, name=f'med{i}', dose='1', time=time(20 - i)) for i in range(10)
+    ]
+    db.session.add_all(medications)
+    db.session.commit()
+    ids = [m.id for m in medications]
+    db.session.expire_all()
+
+    statements.clear()
+    response = client.patch('/medications', headers=auth_headers, json={'ids': ids + [999], 'status': 'taken'})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [m['status'] for m in data['updated']] == ['taken'] * 10
+    assert [m['time'] for m in data['updated']] == sorted(m['time'] for m in data['updated'])
+    assert data['errors'] == [{'id': 999, 'error': 'Medication not found'}]
+    # The account-deletion check, UPDATE ... RETURNING and the sync journal
+    # (bump and read the user's sequence, upsert the changes), however many
+    # rows change
+    assert not [s for s in statements if 'FROM medications' in s], statements
+    assert len(statements) == 5, statements
+
+
+def test_filter_window_wraps_past_midnight(client, user, auth_headers):
+    for hour in (1, 8, 21, 23):
+        db.session.add(Medication(user_id=user.id, name=f'med{hour}', dose='1', time=time(hour)))
+    db.session.commit()
+
+    response = client.patch('/medications', headers=auth_headers,
+                            json={'filter': {'from': '22:00', 'to': '02:00'}, 'status': 'taken'})
+
+    assert response.status_code == 200
+    assert [m['name'] for m in response.get_json()['updated']] == ['med1', 'med23']
+
+
+def test_filter_status_must_be_known(client, user, auth_headers):
+    db.session.add(Medication(user_id=user.id, name='med', dose='1', time=time(8)))
+    db.session.commit()
+
+    response = client.patch('/medications', headers=auth_headers,
+                            json={'filter': {'status': 'skipped'}, 'status': 'taken'})
+
+    assert response.status_code == 400
+    assert db.session.get(Medication, 1).status == 'pending'
@@ -0,0 +1,65 @@
+# Standard library imports
+from datetime import date, time
+
+# Local imports
+from config import db
+from models import PurgeJob, Reading, User
+from alerts import engine as alert_engine
+import forecast
+import purge
+
+
+def add_reading(client, headers, value=120):
+    return client.post('/readings', headers=headers, json={'value': value, 'date': '2026-01-01', 'time': '08:00'})
+
+
+def test_account_takes_no_writes_once_deletion_is_queued(client, user, auth_headers):
+    assert add_reading(client, auth_headers).status_code == 201
+    client.get('/readings/forecast', headers=auth_headers)
+    assert user.id in alert_engine.windows and user.id in forecast.engine.users
+
+    response = client.delete('/me', headers=auth_headers, json={'password': 'secret'})
+    assert response.status_code == 202
+    assert user.id not in alert_engine.windows and user.id not in forecast.engine.users
+
+    assert add_reading(client, auth_headers).status_code == 409
+    response = client.patch('/medications', headers=auth_headers, json={'ids': [1], 'status': 'taken'})
+    assert response.status_code == 409
+    response = client.post('/login', json={'email': 'pat@example.com', 'password': 'secret'})
+    assert response.status_code == 401
+    # Progress stays readable until the account is gone
+    assert client.get('/me/purge', headers=auth_headers).status_code == 200
+
+
+def test_token_of_a_purged_account_cannot_write(client, user, auth_headers):
+    user_id = user.id
+    job, _ = purge.enqueue(user)
+    purge.purge(job)
+    assert db.session.get(User, user_id) is None
+
+    assert add_reading(client, auth_headers).status_code == 401
+    assert db.session.scalar(db.select(db.func.count(Reading.id))) == 0
+
+
+def test_purge_sweeps_rows_written_behind_it(user, monkeypatch):
+    job, _ = purge.enqueue(user)
+    db.session.add(Reading(user_id=user.id, value=110, date=date(2026, 1, 1), time=time(8)))
+    db.session.commit()
+
+    # A write that raced the flag lands after the first pass over the tables
+    delete_owned = purge.delete_owned
+    passes = []
+
+    def racing_write(job, uid, chunk_size):
+        delete_owned(job, uid, chunk_size)
+        if not passes:
+            db.session.add(Reading(user_id=uid, value=115, date=date(2026, 1, 1), time=time(9)))
+            db.session.commit()
+        passes.append(uid)
+
+    monkeypatch.setattr(purge, 'delete_owned', racing_write)
+    purge.run_job(job.id)
+
+    assert db.session.get(PurgeJob, job.id).status == 'done'
+    assert db.session.scalar(db.select(db.func.count(Reading.id))) == 0
+    assert db.session.get(User, job.user_id) is None
@@ -0,0 +1,95 @@
+# Standard library imports
+import time
+
+# Remote library imports
+import pytest
+from sqlalchemy import text
+
+# Local imports
+from config import db
+import ratelimit
+
+
+def login(client):
+    return client.post('/login', json={'email': 'nobody@example.com', 'password': 'wrong'})
+
+
+def test_bucket_empties_and_refills_at_rate():
+    limiter = ratelimit.RateLimiter(rate=2.0, burst=4.0)
+    assert [limiter.take('a', 1, now=0.0) for _ in range(4)] == [0.0] * 4
+    assert limiter.take('a', 1, now=0.0) == 0.5
+    # Other identities have buckets of their own
+    assert limiter.take('b', 4, now=0.0) == 0.0
+    assert limiter.take('a', 1, now=0.5) == 0.0
+    assert limiter.take('a', 3, now=1.0) == 1.0
+
+
+def test_rotation_keeps_only_recent_identities():
+    limiter = ratelimit.RateLimiter(rate=2.0, burst=4.0)
+    # A new address every 10 ms: memory holds at most two generations' worth
+    per_generation = int(limiter.generation / 0.01)
+    sizes = []
+    for i in range(20 * per_generation):
+        now = i * 0.01
+        limiter.take(f'ip:{i}', 1, now=now)
+        sizes.append(len(limiter))
+    assert max(sizes) <= 2 * per_generation + 1
+    # Once everyone has been idle for two generations, only the newcomer is left
+    limiter.take('late', 1, now=now + 2 * limiter.generation)
+    assert len(limiter) == 1
+
+
+def test_empty_bucket_gets_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'limiter', ratelimit.RateLimiter(rate=0.5, burst=3.0))
+    assert [client.post('/meals', json={}).status_code != 429 for _ in range(3)] == [True] * 3
+
+    response = client.post('/meals', json={})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    # Reads are never limited
+    assert client.get('/').status_code != 429
+
+
+def test_login_costs_more_than_other_writes(client):
+    cost = ratelimit.COSTS['login']
+    allowed = int(ratelimit.BURST // cost)
+    assert [login(client).status_code for _ in range(allowed)] == [401] * allowed
+
+    response = login(client)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == str(int(cost / ratelimit.RATE))
+    # A default-cost write from the same address only waits for one token
+    response = client.post('/meals', json={})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_writes_are_shed_while_too_many_are_in_flight(client, monkeypatch):
+    monkeypatch.setattr(ratelimit.monitor, 'in_flight', ratelimit.MAX_IN_FLIGHT)
+    response = login(client)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == str(ratelimit.SHED_RETRY_AFTER)
+
+    monkeypatch.setattr(ratelimit.monitor, 'in_flight', ratelimit.MAX_IN_FLIGHT - 1)
+    assert login(client).status_code == 401
+    # Finished requests give their slot back
+    assert ratelimit.monitor.in_flight == ratelimit.MAX_IN_FLIGHT - 1
+
+
+def test_writes_are_shed_while_the_database_is_slow(client, monkeypatch):
+    monkeypatch.setattr(ratelimit.monitor, 'db_latency', 2 * ratelimit.MAX_DB_LATENCY)
+    monkeypatch.setattr(ratelimit.monitor, 'sampled_at', time.perf_counter())
+    assert login(client).status_code == 429
+
+    # A latency nobody has refreshed for LATENCY_TTL no longer sheds
+    monkeypatch.setattr(ratelimit.monitor, 'sampled_at', time.perf_counter() - ratelimit.LATENCY_TTL - 1)
+    assert login(client).status_code == 401
+
+
+def test_failed_statements_do_not_accumulate_timing_state(app):
+    with db.engine.connect() as conn:
+        for _ in range(5):
+            with pytest.raises(Exception):
+                conn.execute(text('SELECT * FROM no_such_table'))
+        conn.execute(text('SELECT 1'))
+        assert 'query_started' not in conn.info
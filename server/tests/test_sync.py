@@ -0,0 +1,102 @@
+# Remote library imports
+from flask_jwt_extended import create_access_token
+
+# Local imports
+from config import db
+from models import User
+
+
+def sync(client, headers, since=0):
+    response = client.get(f'/sync?since={since}', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def add_reading(client, headers, value, at='08:00'):
+    response = client.post('/readings', headers=headers, json={'value': value, 'date': '2026-01-01', 'time': at})
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def link_meal(client, headers, reading_id, carbs=30):
+    meal_id = client.post('/meals', headers=headers, json={'name': 'oats'}).get_json()['id']
+    response = client.post(f'/readings/{reading_id}/meals', headers=headers,
+                           json={'meal_id': meal_id, 'carbs_amount': carbs})
+    assert response.status_code == 201
+    return meal_id
+
+
+def test_cursor_returns_only_later_changes(client, auth_headers):
+    first = add_reading(client, auth_headers, 110)
+    data = sync(client, auth_headers)
+    assert [r['id'] for r in data['readings']] == [first]
+
+    # Nothing new: same cursor, empty delta
+    again = sync(client, auth_headers, data['cursor'])
+    assert again['cursor'] == data['cursor']
+    assert again['readings'] == [] and again['deleted']['readings'] == []
+
+    second = add_reading(client, auth_headers, 120, at='09:00')
+    delta = sync(client, auth_headers, data['cursor'])
+    assert [r['id'] for r in delta['readings']] == [second]
+    assert delta['cursor'] > data['cursor']
+
+
+def test_updates_collapse_to_the_latest_state(client, auth_headers):
+    reading_id = add_reading(client, auth_headers, 110)
+    cursor = sync(client, auth_headers)['cursor']
+    for value in (111, 112):
+        assert client.patch(f'/readings/{reading_id}', headers=auth_headers, json={'value': value}).status_code == 200
+    delta = sync(client, auth_headers, cursor)
+    assert [(r['id'], r['value']) for r in delta['readings']] == [(reading_id, 112)]
+
+
+def test_deleting_a_reading_tombstones_it_and_its_links(client, auth_headers):
+    reading_id = add_reading(client, auth_headers, 110)
+    meal_id = link_meal(client, auth_headers, reading_id)
+    data = sync(client, auth_headers)
+    assert data['reading_meals'][0]['meal_id'] == meal_id
+
+    assert client.delete(f'/readings/{reading_id}', headers=auth_headers).status_code == 204
+    delta = sync(client, auth_headers, data['cursor'])
+    assert delta['readings'] == [] and delta['reading_meals'] == []
+    assert delta['deleted']['readings'] == [reading_id]
+    assert delta['deleted']['reading_meals'] == [{'reading_id': reading_id, 'meal_id': meal_id}]
+
+    # A client starting from scratch sees the tombstones, never the rows
+    full = sync(client, auth_headers)
+    assert full['readings'] == [] and full['deleted']['readings'] == [reading_id]
+
+
+def test_unlinking_a_meal_tombstones_only_the_link(client, auth_headers):
+    reading_id = add_reading(client, auth_headers, 110)
+    meal_id = link_meal(client, auth_headers, reading_id)
+    cursor = sync(client, auth_headers)['cursor']
+
+    response = client.delete(f'/readings/{reading_id}/meals?meal_id={meal_id}', headers=auth_headers)
+    assert response.status_code == 204
+    delta = sync(client, auth_headers, cursor)
+    assert delta['deleted'] == {
+        'readings': [],
+        'medications': [],
+        'reading_meals': [{'reading_id': reading_id, 'meal_id': meal_id}],
+    }
+
+    # Linking it again replaces the tombstone with the live link
+    link = client.post(f'/readings/{reading_id}/meals', headers=auth_headers, json={'meal_id': meal_id})
+    assert link.status_code == 201
+    delta = sync(client, auth_headers, cursor)
+    assert delta['deleted']['reading_meals'] == []
+    assert [l['meal_id'] for l in delta['reading_meals']] == [meal_id]
+
+
+def test_users_only_see_their_own_changes(client, auth_headers):
+    other = User(name='Sam', email='sam@example.com')
+    other.password_hash = 'secret'
+    db.session.add(other)
+    db.session.commit()
+    other_headers = {'Authorization': f'Bearer {create_access_token(identity=str(other.id))}'}
+
+    add_reading(client, auth_headers, 110)
+    data = sync(client, other_headers)
+    assert data['readings'] == [] and data['cursor'] == 0
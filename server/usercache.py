@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import threading
+from collections import OrderedDict
+
+# Remote library imports
+
+# Local imports
+
+
+class UserCache:
+    """Per-user in-memory state in LRU order, built on first use.
+
+    ``warm_up(user_id, *args)`` builds missing state, usually from a history
+    query. It runs without the lock, so one cold user never stalls lookups for
+    the others; if two requests warm the same user, the first to finish wins.
+    The lock only guards the mapping, not the state objects themselves.
+    """
+
+    def __init__(self, warm_up, max_users):
+        self.warm_up = warm_up
+        self.max_users = max_users
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, *args):
+        """State for ``user_id``, warming it up if it is not in memory."""
+        with self.lock:
+            item = self.items.get(user_id)
+            if item is not None:
+                self.items.move_to_end(user_id)
+                return item
+        item = self.warm_up(user_id, *args)
+        return self.install({user_id: item}, keep_existing=True)[user_id]
+
+    def peek(self, user_id):
+        """State for ``user_id`` if it is in memory, else None; never warms up."""
+        with self.lock:
+            return self.items.get(user_id)
+
+    def install(self, items, keep_existing=False):
+        """Store states by user id; returns the ones now cached for those ids."""
+        with self.lock:
+            for user_id, item in items.items():
+                if keep_existing:
+                    item = self.items.setdefault(user_id, item)
+                else:
+                    self.items[user_id] = item
+                self.items.move_to_end(user_id)
+            installed = {user_id: self.items[user_id] for user_id in items}
+            while len(self.items) > self.max_users:
+                self.items.popitem(last=False)
+            return installed
+
+    def evict(self, user_id):
+        with self.lock:
+            self.items.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def __contains__(self, user_id):
+        return user_id in self.items
+
+    def __len__(self):
+        return len(self.items)